@@ -1,63 +1,175 @@
-# pip install duckdb pandas pyarrow plotly
+# pip install duckdb pyarrow plotly
+
+import os
 
 import duckdb
-import pandas as pd
+import numpy as np
+import pyarrow as pa
 import plotly.graph_objects as go
 
+# 复用同一个连接：DuckDB 的解析/优化结果和 parquet 元数据缓存都挂在连接上
+con = duckdb.connect()
+con.execute(f"PRAGMA threads={os.cpu_count() or 1}")
+
+# 参数化查询：$1 = timeframe, $2 = parquet 路径（支持 glob / hive 目录）
+# 价格输出为 FLOAT（画图精度足够，字节数减半）；成交量合计可能超过 int32，保留 BIGINT
+RESAMPLE_SELECT = """
+SELECT
+  symbol,
+  time_bucket(CAST($1 AS INTERVAL), ts, TIMESTAMP '1970-01-01') AS ts,
+  CAST(arg_min(open, ts) AS FLOAT)  AS open,
+  CAST(max(high) AS FLOAT)          AS high,
+  CAST(min(low) AS FLOAT)           AS low,
+  CAST(arg_max(close, ts) AS FLOAT) AS close,
+  CAST(sum(volume) AS BIGINT)       AS volume
+FROM read_parquet($2, hive_partitioning = true)
+GROUP BY symbol, 2
+"""
+
+RESAMPLE_QUERY = RESAMPLE_SELECT + "ORDER BY 2\n"
+
+# M4：bar 数远大于屏幕像素时，按时间把 bar 均分到 $3 个像素桶里，
+# 每个桶保留 first open / max high / min low / last close，影线极值不会丢。
+# bar 数不超过 $3 时 k 就是 bar 自己的时间，结果与 RESAMPLE_QUERY 相同。
+M4_QUERY = f"""
+WITH agg AS ({RESAMPLE_SELECT}),
+q AS (
+  SELECT
+    *,
+    CASE
+      WHEN count(*) OVER w > $3 THEN least(
+        floor(
+          $3 * (epoch(ts) - min(epoch(ts)) OVER w)
+          / nullif(max(epoch(ts)) OVER w - min(epoch(ts)) OVER w, 0)
+        ),
+        $3 - 1
+      )
+      ELSE epoch(ts)
+    END AS k
+  FROM agg
+  WINDOW w AS (PARTITION BY symbol)
+)
+SELECT
+  symbol,
+  min(ts)              AS ts,
+  arg_min(open, ts)    AS open,
+  max(high)            AS high,
+  min(low)             AS low,
+  arg_max(close, ts)   AS close,
+  sum(volume)::BIGINT  AS volume
+FROM q
+GROUP BY symbol, k
+ORDER BY ts
+"""
+
 
 def load_ohlcv_resampled(
-    parquet_path: str, timeframe: str = "15 minutes"
-) -> pd.DataFrame:
+    parquet_path: str, timeframe: str = "15 minutes", max_bars: int | None = 4096
+) -> pa.Table:
     """
+    返回 pyarrow.Table，列直接转成 numpy 交给 Plotly，不经过 pandas。
     parquet 里假设有列：
     symbol, ts(UTC timestamp), open, high, low, close, volume
     timeframe 示例: '5 minutes', '15 minutes', '1 hour', '1 day'
+    max_bars: 重采样后 bar 数超过它时再做一次 M4 聚合到约 max_bars 根（≈ 屏幕宽度像素），
+    None 表示不做
     """
-    con = duckdb.connect()
-
-    # DuckDB 用 date_bin 做对齐分桶（更像交易软件的 bar）
-    # 注意：date_bin 需要一个 anchor，这里用 epoch
-    q = f"""
-    WITH base AS (
-      SELECT
-        symbol,
-        ts,
-        open, high, low, close,
-        volume,
-        date_bin(INTERVAL '{timeframe}', ts, TIMESTAMP '1970-01-01') AS bucket
-      FROM read_parquet('{parquet_path}')
-    ),
-    agg AS (
-      SELECT
-        symbol,
-        bucket AS ts,
-        arg_min(open, ts)  AS open,
-        max(high)          AS high,
-        min(low)           AS low,
-        arg_max(close, ts) AS close,
-        sum(volume)        AS volume
-      FROM base
-      GROUP BY symbol, bucket
-    )
-    SELECT * FROM agg
-    ORDER BY ts
+    # DuckDB 用 time_bucket 做对齐分桶（更像交易软件的 bar）
+    # 注意：time_bucket 需要一个 origin，这里用 epoch
+    if max_bars is None:
+        return con.execute(RESAMPLE_QUERY, [timeframe, parquet_path]).to_arrow_table()
+    return con.execute(M4_QUERY, [timeframe, parquet_path, max_bars]).to_arrow_table()
+
+
+# 超过这个 bar 数，SVG 的 go.Candlestick 会明显卡顿，改用 WebGL 绘制
+WEBGL_MIN_BARS = 10_000
+# 超过该 bar 数时成交量柱不参与 hover 计算
+HOVER_MAX_BARS = 5_000
+INCREASING_COLOR = "#3D9970"
+DECREASING_COLOR = "#FF4136"
+
+
+def _column(table: pa.Table, name: str, dtype=None) -> np.ndarray:
+    # 单 chunk 的数值列可零拷贝转 numpy；多 chunk 时才拼接
+    return np.asarray(table.column(name).to_numpy(), dtype=dtype)
+
+
+def _webgl_candle_traces(table: pa.Table) -> list:
+    """
+    用 Scattergl 线段模拟 K 线：影线 low→high，实体 open→close（更粗的线）。
+    每根 bar 占 3 个点，第 3 个点 y=NaN 把线段断开（connectgaps=False）。
     """
-    df = con.execute(q).df()
-    return df
+    ts = _column(table, "ts")
+    open_ = _column(table, "open", np.float32)
+    high = _column(table, "high", np.float32)
+    low = _column(table, "low", np.float32)
+    close = _column(table, "close", np.float32)
+    up = close >= open_
 
+    traces = []
+    for mask, color, name in (
+        (up, INCREASING_COLOR, "Up"),
+        (~up, DECREASING_COLOR, "Down"),
+    ):
+        x = np.repeat(ts[mask], 3)
+        gap = np.full(mask.sum(), np.nan, dtype=np.float32)
+        wick_y = np.column_stack([low[mask], high[mask], gap]).ravel()
+        body_y = np.column_stack([open_[mask], close[mask], gap]).ravel()
+        traces.append(
+            go.Scattergl(
+                x=x,
+                y=wick_y,
+                mode="lines",
+                line=dict(color=color, width=1),
+                connectgaps=False,
+                hoverinfo="skip",
+                showlegend=False,
+            )
+        )
+        traces.append(
+            go.Scattergl(
+                x=x,
+                y=body_y,
+                mode="lines",
+                line=dict(color=color, width=3),
+                connectgaps=False,
+                name=name,
+            )
+        )
+    return traces
 
-def plot_candles(df: pd.DataFrame, title: str = ""):
-    fig = go.Figure(
-        data=[
+
+def plot_candles(table: pa.Table, title: str = ""):
+    n_bars = table.num_rows
+    ts = _column(table, "ts")
+    if n_bars > WEBGL_MIN_BARS:
+        price_traces = _webgl_candle_traces(table)
+    else:
+        # float32 数组让 Plotly 以 typed array 序列化，而不是逐个 Python float
+        price_traces = [
             go.Candlestick(
-                x=df["ts"],
-                open=df["open"],
-                high=df["high"],
-                low=df["low"],
-                close=df["close"],
+                x=ts,
+                open=_column(table, "open", np.float32),
+                high=_column(table, "high", np.float32),
+                low=_column(table, "low", np.float32),
+                close=_column(table, "close", np.float32),
+                increasing_line_width=1,
+                decreasing_line_width=1,
                 name="OHLC",
+            )
+        ]
+
+    fig = go.Figure(
+        data=[
+            *price_traces,
+            go.Bar(
+                x=ts,
+                y=_column(table, "volume"),
+                name="Volume",
+                yaxis="y2",
+                opacity=0.35,
+                hoverinfo="skip" if n_bars > HOVER_MAX_BARS else None,
             ),
-            go.Bar(x=df["ts"], y=df["volume"], name="Volume", yaxis="y2", opacity=0.35),
         ]
     )
     fig.update_layout(
@@ -67,10 +179,15 @@ def plot_candles(df: pd.DataFrame, title: str = ""):
         yaxis2=dict(title="Volume", overlaying="y", side="right", showgrid=False),
         hovermode="x unified",
         height=700,
+        dragmode="pan",
+        # 平移/缩放后保留视图状态，不做过渡动画
+        uirevision="candles",
+        transition_duration=0,
     )
-    fig.show()
+    # 大数据量时跳过整图校验（会遍历所有 trace 数据）
+    fig.show(validate=n_bars <= WEBGL_MIN_BARS)
 
 
 if __name__ == "__main__":
-    df = load_ohlcv_resampled("data/AAPL_1min.parquet", timeframe="15 minutes")
-    plot_candles(df, title="AAPL 15m (resampled from 1m)")
+    table = load_ohlcv_resampled("data/AAPL_1min.parquet", timeframe="15 minutes")
+    plot_candles(table, title="AAPL 15m (resampled from 1m)")
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import time
+import polars as pl
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+
+class FileCache:
+    """
+    On-disk cache of fetched price frames, one parquet file per request.
+    Entries older than `ttl` are treated as missing; ttl=None never expires.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: Optional[timedelta] = timedelta(days=1)):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, symbol: str, *parts: str) -> Path:
+        key = hashlib.md5("|".join([symbol, *parts]).encode()).hexdigest()
+        return self.cache_dir / symbol.upper() / f"{key}.parquet"
+
+    def _expired(self, path: Path) -> bool:
+        if self.ttl is None:
+            return False
+        return time.time() - path.stat().st_mtime > self.ttl.total_seconds()
+
+    def get(self, symbol: str, *parts: str) -> Optional[pl.DataFrame]:
+        path = self._path(symbol, *parts)
+        try:
+            if self._expired(path):
+                path.unlink(missing_ok=True)
+                return None
+            return pl.read_parquet(path)
+        except (OSError, pl.exceptions.PolarsError):
+            # Missing, or a partial/corrupt file: refetch
+            return None
+
+    def set(self, symbol: str, df: pl.DataFrame, *parts: str):
+        path = self._path(symbol, *parts)
+        # Write then rename so concurrent readers never see a partial file
+        tmp = path.with_suffix(f".{os.getpid()}.{time.monotonic_ns()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.write_parquet(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            # The cache is best-effort; never fail a fetch because of it
+            print(f"Could not cache data for {symbol}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def prune(self):
+        """
+        Delete expired entries. Most keys include a start date that moves
+        on with every sync, so stale files would otherwise never be read
+        (and removed) again.
+        """
+        if self.ttl is None or not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob("*/*.parquet"):
+            try:
+                if self._expired(path):
+                    path.unlink(missing_ok=True)
+            except OSError:
+                # Removed concurrently, or not ours to delete: skip it
+                pass
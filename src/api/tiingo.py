@@ -1,14 +1,56 @@
+import asyncio
+import io
+import httpx
 import requests
 import polars as pl
-from datetime import datetime, timedelta
-from typing import Optional
-from src.config import TIINGO_API_KEY
+from urllib.parse import urlencode
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from datetime import timedelta
+from typing import BinaryIO, Optional
+from src.api.cache import FileCache
+from src.config import TIINGO_API_KEY, TIINGO_CACHE_DIR, TIINGO_CACHE_TTL_HOURS
+
+
+# Default for TiingoClient(cache=...): the shared on-disk cache, unless
+# TIINGO_CACHE_TTL_HOURS=0. Passing cache=None disables caching.
+DEFAULT_CACHE = object()
+
+
+def _read_prices_csv(body: BinaryIO) -> Optional[pl.DataFrame]:
+    """
+    Parse a Tiingo prices CSV into Polars.
+    Returns None for an empty body or a header-only CSV.
+    """
+    # Tiingo returns empty CSV if no data (just headers sometimes, or empty text)
+    if not body.peek(1).strip():
+        return None
+
+    # Parse with pyarrow's multithreaded CSV reader and type the date
+    # column during parsing, then hand the Arrow table to Polars
+    # without copying.
+    table = pacsv.read_csv(
+        body,
+        convert_options=pacsv.ConvertOptions(column_types={"date": pa.date32()}),
+    )
+    if table.num_rows == 0:
+        return None
+
+    return pl.from_arrow(table)
 
 
 class TiingoClient:
     BASE_URL = "https://api.tiingo.com/tiingo/daily"
+    TIMEOUT = 30
+    # Query parameters shared by every prices request, encoded once
+    PRICES_QUERY = urlencode({"resampleFreq": "daily", "format": "csv"})
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        pool_size: int = 10,
+        cache: Optional[FileCache] | object = DEFAULT_CACHE,
+    ):
         self.api_key = api_key or TIINGO_API_KEY
         if not self.api_key:
             raise ValueError("TIINGO_API_KEY is not set.")
@@ -16,46 +58,130 @@ class TiingoClient:
             "Content-Type": "application/json",
             "Authorization": f"Token {self.api_key}",
         }
+        # One session shared by all worker threads: keeps connections to
+        # Tiingo alive instead of a new TLS handshake per ticker.
+        # pool_size should match the number of concurrent callers.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+
+        # Header merging and environment lookups (proxies, CA bundle) are the
+        # same for every ticker, so do them once and only swap the URL per call.
+        self._prepared = self.session.prepare_request(
+            requests.Request("GET", self.BASE_URL)
+        )
+        self._send_kwargs = self.session.merge_environment_settings(
+            self.BASE_URL, {}, True, None, None
+        )
+        self._send_kwargs.update(timeout=self.TIMEOUT, stream=True)
+
+        if cache is DEFAULT_CACHE:
+            cache = None
+            if TIINGO_CACHE_TTL_HOURS > 0:
+                cache = FileCache(
+                    TIINGO_CACHE_DIR, ttl=timedelta(hours=TIINGO_CACHE_TTL_HOURS)
+                )
+        self.cache = cache
+        if self.cache is not None:
+            self.cache.prune()
+
+    def _cached(self, symbol: str, start_date: str) -> Optional[pl.DataFrame]:
+        if self.cache is None:
+            return None
+        return self.cache.get(symbol, start_date)
+
+    def _store_cached(
+        self, symbol: str, start_date: str, df: Optional[pl.DataFrame]
+    ) -> Optional[pl.DataFrame]:
+        # Empty/failed responses are not cached so they are retried next run
+        if self.cache is not None and df is not None:
+            self.cache.set(symbol, df, start_date)
+        return df
+
+    def _prices_url(self, symbol: str, start_date: str) -> str:
+        return f"{self.BASE_URL}/{symbol}/prices?startDate={start_date}&{self.PRICES_QUERY}"
 
     def fetch_daily_history(
-        self, symbol: str, start_date: str = "1970-1-1"
+        self, symbol: str, start_date: str = "1970-1-1", use_cache: bool = True
     ) -> Optional[pl.DataFrame]:
         """
         Fetch historical daily data for a symbol using CSV format for bandwidth efficiency.
         Defaults to 1970-01-01 to capture full history for most stocks.
+        Responses are served from the disk cache while it is fresh, unless
+        use_cache=False; the fresh response then replaces the cached one.
         """
-        url = f"{self.BASE_URL}/{symbol}/prices"
-        params = {
-            "startDate": start_date,
-            "resampleFreq": "daily",
-            "format": "csv",  # Request CSV format
-        }
+        if use_cache:
+            cached = self._cached(symbol, start_date)
+            if cached is not None:
+                return cached
 
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
+        prepped = self._prepared.copy()
+        prepped.url = self._prices_url(symbol, start_date)
 
-            # Tiingo returns empty CSV if no data (just headers sometimes, or empty text)
-            if not response.text or len(response.text.strip()) == 0:
-                return None
+        try:
+            # Stream the body straight into the CSV reader rather than
+            # materializing response.content first.
+            with self.session.send(prepped, **self._send_kwargs) as response:
+                response.raise_for_status()
+                raw = response.raw
+                raw.decode_content = True
+                # Keep urllib3 from closing the stream at EOF under the reader
+                raw.auto_close = False
+                df = _read_prices_csv(io.BufferedReader(raw))
+            return self._store_cached(symbol, start_date, df)
 
-            # Parse CSV directly into Polars
-            # We use io.BytesIO because read_csv expects bytes or file-like
-            import io
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error processing {symbol}: {e}")
+            return None
 
-            data = io.BytesIO(response.content)
+    def async_session(self, max_connections: int = 128) -> httpx.AsyncClient:
+        """
+        Create an httpx.AsyncClient for afetch_daily_history.
+        Use it as an async context manager so connections are closed.
+        HTTP/2 multiplexes concurrent requests over a few connections instead
+        of opening one TCP/TLS connection per in-flight request.
+        """
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.TIMEOUT,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=20
+            ),
+        )
 
-            df = pl.read_csv(data)
+    async def afetch_daily_history(
+        self,
+        http: httpx.AsyncClient,
+        symbol: str,
+        start_date: str = "1970-1-1",
+        use_cache: bool = True,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Async variant of fetch_daily_history using a shared httpx.AsyncClient,
+        so many requests can be in flight on a single thread.
+        """
+        if use_cache:
+            cached = await asyncio.to_thread(self._cached, symbol, start_date)
+            if cached is not None:
+                return cached
 
-            # Ensure date column is properly typed
-            if "date" in df.columns:
-                df = df.with_columns(
-                    pl.col("date").str.strptime(pl.Date, format="%Y-%m-%d")
-                )
+        try:
+            response = await http.get(self._prices_url(symbol, start_date))
+            response.raise_for_status()
 
-            return df
+            # CSV parsing is CPU work; keep it off the event loop.
+            body = io.BufferedReader(io.BytesIO(response.content))
+            df = await asyncio.to_thread(_read_prices_csv, body)
+            return await asyncio.to_thread(self._store_cached, symbol, start_date, df)
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
         except Exception as e:
@@ -1,12 +1,14 @@
 import typer
 import polars as pl
 from rich.console import Console
-from rich.progress import track, Progress
+from rich.progress import Progress
 from typing import List
 from pathlib import Path
-from datetime import timedelta
+from datetime import date, timedelta
+from functools import lru_cache
 from src.api.tiingo import TiingoClient
 from src.storage.parquet_store import ParquetStore
+from src.config import SCAN_CACHE_DIR, SCAN_CACHE_ENABLED, STORAGE_BACKEND
 from src.scanner.engine import ScannerEngine
 from src.scanner.filters.common import (
     MinPriceFilter,
@@ -19,19 +21,60 @@ from src.scanner.filters.gap import GapUpFilter
 from src.visualization.plotter import Plotter
 from src.scanner.recipe import RecipeManager
 from rich.table import Table
-import concurrent.futures
+import asyncio
+import httpx
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 app = typer.Typer()
 console = Console()
-store = ParquetStore()
-scanner_engine = ScannerEngine()
+if STORAGE_BACKEND == "duckdb":
+    from src.storage.duckdb_store import DuckDBStore
+
+    store = DuckDBStore()
+else:
+    store = ParquetStore()
+scanner_engine = ScannerEngine(
+    store=store, cache_dir=SCAN_CACHE_DIR if SCAN_CACHE_ENABLED else None
+)
 plotter = Plotter()
 
 TICKER_FILE = Path(__file__).resolve().parent / "data" / "tickers.csv"
 VOLUME_THRESHOLD = 150_000_000
 LOOKBACK_DAYS = 60
-MAX_WORKERS = 32
+FULL_HISTORY_START = "1970-01-01"
+# Concurrent Tiingo requests during sync_all
+ASYNC_CONCURRENCY = 64
+# Worker threads for the explicit `sync` command
+SYNC_WORKERS = 16
+# Columns the chart draws; the rest of the stored history is not read
+PLOT_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+
+@lru_cache(maxsize=1)
+def _parse_ticker_file(path: Path, mtime_ns: int) -> tuple[str, ...]:
+    # Keyed on mtime so an edited universe file is re-parsed, not served stale.
+    # One symbol per line; parse and normalize in Polars rather than a
+    # Python loop so large (whole-exchange) universe files stay cheap.
+    try:
+        raw = pl.read_csv(
+            path,
+            has_header=False,
+            new_columns=["symbol"],
+            comment_prefix="#",
+            quote_char=None,
+            schema_overrides=[pl.String],
+        )
+    except pl.exceptions.NoDataError:
+        return ()
+
+    symbol = pl.col("symbol")
+    return tuple(
+        raw.select(symbol.str.strip_chars().str.to_uppercase())
+        .filter((symbol != "") & ~symbol.str.starts_with("#"))
+        .to_series()
+        .to_list()
+    )
 
 
 def _load_ticker_universe() -> list[str]:
@@ -39,63 +82,181 @@ def _load_ticker_universe() -> list[str]:
         console.print(f"[red]Ticker file not found: {TICKER_FILE}[/red]")
         return []
 
-    tickers = []
-    for line in TICKER_FILE.read_text().splitlines():
-        symbol = line.strip().upper()
-        if not symbol or symbol.startswith("#"):
-            continue
-        tickers.append(symbol)
+    return list(_parse_ticker_file(TICKER_FILE, TICKER_FILE.stat().st_mtime_ns))
 
-    return tickers
 
+def _sync_start_date(symbol: str) -> tuple[str | None, bool]:
+    """
+    Decide where to resume fetching a ticker.
+    Returns (start_date, incremental): start_date is None when the stored
+    data is already current; incremental is True if history exists locally.
+    """
+    last = store.last_date(symbol)
+    if last is None:
+        return FULL_HISTORY_START, False
 
-def _dollar_volume_last_2_months(df: pl.DataFrame) -> float:
-    if df.is_empty():
-        return 0.0
+    start = last + timedelta(days=1)
+    if start > date.today():
+        return None, True
+    return start.isoformat(), True
 
-    end_date = df["date"].max()
-    if end_date is None:
-        return 0.0
 
-    start_date = end_date - timedelta(days=LOOKBACK_DAYS)
-    recent = df.filter(pl.col("date") >= start_date)
-    if recent.is_empty():
-        return 0.0
+def _has_adjustment_event(df: pl.DataFrame) -> bool:
+    """
+    A split or dividend in the new bars restates Tiingo's adjusted columns
+    for the whole history, so the stored rows can no longer be appended to.
+    """
+    events = []
+    if "splitFactor" in df.columns:
+        events.append(pl.col("splitFactor") != 1.0)
+    if "divCash" in df.columns:
+        events.append(pl.col("divCash") != 0.0)
+    if not events:
+        return False
+    return df.select(pl.any_horizontal(events).any()).item()
+
+
+def _save_fetched(
+    symbol: str, df: pl.DataFrame | None, incremental: bool = False
+) -> tuple[str, bool, str]:
+    """
+    Persist freshly fetched data for a ticker.
+    With incremental=True, `df` holds only bars after the stored history.
+    Returns: (symbol, success, message)
+    """
+    try:
+        if df is None or df.is_empty():
+            if not incremental:
+                return symbol, False, "Failed to fetch or empty data"
+            return symbol, True, "Up to date"
+
+        if incremental:
+            store.append_ticker_data(symbol, df)
+            return symbol, True, f"Synced (+{df.height} bars)"
+
+        store.save_ticker_data(symbol, df)
+        return symbol, True, "Synced"
 
-    total = recent.select((pl.col("close") * pl.col("volume")).sum()).item()
-    return float(total or 0.0)
+    except Exception as e:
+        return symbol, False, str(e)
 
 
-def _sync_one_ticker(symbol: str) -> tuple[str, bool, str, float]:
+def _sync_one_ticker(symbol: str, client: TiingoClient) -> tuple[str, bool, str]:
     """
     Helper function to sync a single ticker.
-    Returns: (symbol, success, message, dollar_volume)
+    Only bars after the last stored date are fetched.
+    Returns: (symbol, success, message)
     """
     try:
-        # Create a new client instance per thread/task to be safe,
-        # though requests.Session is generally thread-safe.
-        # However, api_key reading might be cleaner this way.
-        client = TiingoClient()
-        df = client.fetch_daily_history(symbol)
+        start_date, incremental = _sync_start_date(symbol)
+        if start_date is None:
+            return _save_fetched(symbol, None, incremental=True)
+
+        df = client.fetch_daily_history(symbol, start_date=start_date)
+        if incremental and df is not None and _has_adjustment_event(df):
+            # A cached full history may predate the split/dividend
+            df = client.fetch_daily_history(
+                symbol, start_date=FULL_HISTORY_START, use_cache=False
+            )
+            incremental = False
+    except Exception as e:
+        return symbol, False, str(e)
 
-        if df is None or df.is_empty():
-            return symbol, False, "Failed to fetch or empty data", 0.0
+    return _save_fetched(symbol, df, incremental)
 
-        dollar_volume = _dollar_volume_last_2_months(df)
-        store.save_ticker_data(symbol, df)
 
-        if dollar_volume >= VOLUME_THRESHOLD:
-            return symbol, True, "Synced", dollar_volume
-        else:
-            return (
-                symbol,
-                True,
-                f"Synced (below threshold: ${dollar_volume:,.0f})",
-                dollar_volume,
-            )
+async def _sync_one_async(
+    client: TiingoClient,
+    http: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    symbol: str,
+) -> tuple[str, bool, str]:
+    """
+    Async counterpart of _sync_one_ticker used by sync_all.
+    `sem` is held from the fetch through the save, so at most that many
+    fetched frames are in memory at once; store access runs in worker threads
+    since Polars/pyarrow release the GIL while reading and writing.
+    """
+    async with sem:
+        try:
+            start_date, incremental = await asyncio.to_thread(_sync_start_date, symbol)
+            if start_date is None:
+                return await asyncio.to_thread(_save_fetched, symbol, None, True)
+
+            df = await client.afetch_daily_history(http, symbol, start_date)
+            if incremental and df is not None and _has_adjustment_event(df):
+                # A cached full history may predate the split/dividend
+                df = await client.afetch_daily_history(
+                    http, symbol, FULL_HISTORY_START, use_cache=False
+                )
+                incremental = False
+        except Exception as e:
+            return symbol, False, str(e)
 
-    except Exception as e:
-        return symbol, False, str(e), 0.0
+        return await asyncio.to_thread(_save_fetched, symbol, df, incremental)
+
+
+async def _sync_universe(
+    client: TiingoClient, tickers: list[str], progress, task_id
+) -> list[str]:
+    """
+    Fetch and save every ticker concurrently on one event loop.
+    Returns the symbols that were synced successfully.
+    """
+    synced = []
+    sem = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+    async with client.async_session(max_connections=ASYNC_CONCURRENCY) as http:
+        tasks = [_sync_one_async(client, http, sem, symbol) for symbol in tickers]
+
+        for next_done in asyncio.as_completed(tasks):
+            sym, success, msg = await next_done
+
+            if success:
+                synced.append(sym)
+                progress.console.print(f"[green]{msg} {sym}[/green]")
+            else:
+                progress.console.print(f"[red]{msg} {sym}[/red]")
+
+            progress.advance(task_id)
+
+    return synced
+
+
+def _fixed_2dp(expr: pl.Expr) -> pl.Expr:
+    """Vectorized equivalent of f"{x:.2f}", up to rounding of exact half cents."""
+    return (
+        expr.round(2)
+        .cast(pl.Decimal(38, 2), strict=False)
+        .cast(pl.String)
+        # nan/inf have no decimal form
+        .fill_null(expr.cast(pl.String).str.to_lowercase())
+    )
+
+
+def _thousands(expr: pl.Expr) -> pl.Expr:
+    """Vectorized equivalent of f"{n:,}" for non-negative integers."""
+    return (
+        expr.cast(pl.Int64)
+        .cast(pl.String)
+        .str.reverse()
+        .str.replace_all(r"(\d{3})", "${1},")
+        .str.reverse()
+        .str.strip_chars_start(",")
+    )
+
+
+def _optional_2dp(df: pl.DataFrame, col: str, suffix: str = "") -> pl.Expr:
+    """Two-decimal column, or "-" where the column is missing, null or zero."""
+    if col not in df.columns:
+        return pl.lit("-").alias(col)
+    value = pl.col(col)
+    return (
+        pl.when(value.is_null() | (value == 0))
+        .then(pl.lit("-"))
+        .otherwise(pl.concat_str(_fixed_2dp(value), pl.lit(suffix)))
+        .alias(col)
+    )
 
 
 @app.command()
@@ -106,20 +267,29 @@ def sync(symbols: List[str]):
     """
     try:
         # Check API key early
-        TiingoClient()
+        client = TiingoClient(pool_size=SYNC_WORKERS)
     except ValueError as e:
         console.print(f"[red]{e}[/red]")
         console.print("Please set TIINGO_API_KEY in .env file")
         raise typer.Exit(code=1)
 
-    for symbol in track(symbols, description="Syncing data..."):
-        symbol = symbol.upper()
-        # Use the helper but ignore dollar volume for explicit sync
-        _, success, msg, _ = _sync_one_ticker(symbol)
-        if success:
-            console.print(f"[green]Synced {symbol}[/green]")
-        else:
-            console.print(f"[red]{msg} {symbol}[/red]")
+    # Deduplicate so two workers never write the same ticker's file
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+
+    with Progress() as progress:
+        task_id = progress.add_task("Syncing data...", total=len(symbols))
+        # Fetches are blocking network I/O, so threads overlap the round trips
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+            futures = [
+                pool.submit(_sync_one_ticker, symbol, client) for symbol in symbols
+            ]
+            for future in as_completed(futures):
+                symbol, success, msg = future.result()
+                if success:
+                    progress.console.print(f"[green]Synced {symbol}[/green]")
+                else:
+                    progress.console.print(f"[red]{msg} {symbol}[/red]")
+                progress.advance(task_id)
 
 
 @app.command()
@@ -129,7 +299,7 @@ def sync_all():
     """
     try:
         # Check API key early
-        TiingoClient()
+        client = TiingoClient()
     except ValueError as e:
         console.print(f"[red]{e}[/red]")
         console.print("Please set TIINGO_API_KEY in .env file")
@@ -141,40 +311,20 @@ def sync_all():
         return
 
     console.print(
-        f"Starting concurrent sync for {len(tickers)} tickers with {MAX_WORKERS} workers..."
+        f"Starting concurrent sync for {len(tickers)} tickers "
+        f"with up to {ASYNC_CONCURRENCY} requests in flight..."
     )
 
-    eligible_count = 0
-
     with Progress() as progress:
         task_id = progress.add_task("Fetching universe...", total=len(tickers))
+        synced = asyncio.run(_sync_universe(client, tickers, progress, task_id))
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            # Submit all tasks
-            future_to_symbol = {
-                executor.submit(_sync_one_ticker, symbol): symbol for symbol in tickers
-            }
-
-            for future in concurrent.futures.as_completed(future_to_symbol):
-                symbol = future_to_symbol[future]
-                try:
-                    sym, success, msg, dollar_vol = future.result()
-
-                    if success:
-                        if dollar_vol >= VOLUME_THRESHOLD:
-                            eligible_count += 1
-                            progress.console.print(f"[green]{msg} {sym}[/green]")
-                        else:
-                            progress.console.print(f"[yellow]{msg} {sym}[/yellow]")
-                    else:
-                        progress.console.print(f"[red]{msg} {sym}[/red]")
-
-                except Exception as exc:
-                    progress.console.print(
-                        f"[red]Generated an exception for {symbol}: {exc}[/red]"
-                    )
-
-                progress.advance(task_id)
+    # Liquidity check for the whole universe in one query over the stored data
+    # rather than once per ticker inside the workers.
+    dollar_volumes = store.dollar_volumes(LOOKBACK_DAYS, synced)
+    eligible_count = dollar_volumes.filter(
+        pl.col("dollar_volume") >= VOLUME_THRESHOLD
+    ).height
 
     if eligible_count == 0:
         console.print(
@@ -216,6 +366,9 @@ def scan(
     interactive: bool = typer.Option(
         False, "--interactive", "-i", help="Run in interactive mode"
     ),
+    workers: int = typer.Option(
+        1, help="Worker processes to shard the scan across (parquet storage only)"
+    ),
 ):
     """
     Scan local data for stocks matching criteria.
@@ -325,7 +478,18 @@ def scan(
         filters.append(TrendTemplateFilter())
 
     try:
-        results = scanner_engine.scan(filters)
+        # Price/volume floors only look at the latest bar, so narrow the
+        # universe with one pushed-down scan before computing indicators.
+        symbols = None
+        if min_price is not None or min_volume is not None:
+            symbols = store.latest_rows(min_price, min_volume)["symbol"].to_list()
+
+        if workers > 1:
+            results = scanner_engine.scan_parallel(
+                filters, symbols=symbols, n_workers=workers
+            )
+        else:
+            results = scanner_engine.scan(filters, symbols=symbols)
     except Exception as e:
         console.print(f"[red]Error during scan: {e}[/red]")
         # Print full traceback for debugging if needed, but simple error is user friendly
@@ -358,17 +522,21 @@ def scan(
     table.add_column("SMA50", justify="right")
     table.add_column("SMA200", justify="right")
 
-    for row in results.iter_rows(named=True):
-        table.add_row(
-            row["symbol"],
-            str(row["date"]),
-            f"${row['close']:.2f}",
-            f"{row['volume']:,}",
-            f"{row.get('rvol_20', 0):.2f}" if row.get("rvol_20") else "-",
-            f"{row.get('adr_20', 0):.2f}%" if row.get("adr_20") else "-",
-            f"{row.get('sma_50', 0):.2f}" if row.get("sma_50") else "-",
-            f"{row.get('sma_200', 0):.2f}" if row.get("sma_200") else "-",
-        )
+    # Format every cell in Polars first; the loop below only appends strings.
+    formatted = results.select(
+        pl.col("symbol"),
+        pl.col("date").cast(pl.String),
+        pl.concat_str(pl.lit("$"), _fixed_2dp(pl.col("close"))),
+        _thousands(pl.col("volume")),
+        _optional_2dp(results, "rvol_20"),
+        _optional_2dp(results, "adr_20", suffix="%"),
+        _optional_2dp(results, "sma_50"),
+        _optional_2dp(results, "sma_200"),
+    )
+
+    # Walk the columns side by side rather than building a row object per row
+    for row in zip(*(column.to_list() for column in formatted.get_columns())):
+        table.add_row(*row)
 
     console.print(table)
 
@@ -400,7 +568,7 @@ def plot(
     for ticker in tickers:
         ticker = ticker.upper()
         try:
-            df = store.load_ticker_data(ticker)
+            df = store.scan_ticker_data(ticker, PLOT_COLUMNS).collect()
             ticker_data.append((ticker, df))
         except FileNotFoundError:
             console.print(
@@ -425,20 +593,22 @@ def head(ticker: str, n: int = typer.Option(10, help="Number of rows to display"
     Show the first N rows of a ticker's parquet data in a readable table.
     """
     ticker = ticker.upper()
-    df = store.load_ticker_data(ticker)
+    # Only the first n rows are read from storage
+    preview = store.scan_ticker_data(ticker).head(n).collect()
 
-    if df.is_empty():
+    if preview.is_empty():
         console.print(f"[yellow]No data found for {ticker}.[/yellow]")
         return
 
-    preview = df.head(n)
     table = Table(title=f"{ticker} - Head {min(n, preview.height)} Rows")
 
     for col in preview.columns:
         table.add_column(col)
 
-    for row in preview.iter_rows():
-        table.add_row(*[str(value) for value in row])
+    # Stringify in Polars once instead of calling str() on every cell
+    cells = preview.select(pl.all().cast(pl.String).fill_null("None"))
+    for row in zip(*(column.to_list() for column in cells.get_columns())):
+        table.add_row(*row)
 
     console.print(table)
 
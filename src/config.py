@@ -16,6 +16,20 @@ if not TIINGO_API_KEY:
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DAILY_DATA_DIR = DATA_DIR / "daily"
+DUCKDB_PATH = DATA_DIR / "prices.duckdb"
+
+# Storage backend for synced prices: "parquet" (one file per ticker) or "duckdb"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "parquet").lower()
+
+# Disk cache for Tiingo responses, so a re-run soon after a crash or partial
+# sync skips the network. Set TIINGO_CACHE_TTL_HOURS=0 to disable.
+TIINGO_CACHE_DIR = BASE_DIR / ".cache" / "tiingo"
+TIINGO_CACHE_TTL_HOURS = float(os.getenv("TIINGO_CACHE_TTL_HOURS", "24"))
+
+# Cached scan results, invalidated when any stored ticker file changes.
+# Set SCAN_CACHE=0 to disable.
+SCAN_CACHE_DIR = BASE_DIR / ".cache" / "scans"
+SCAN_CACHE_ENABLED = os.getenv("SCAN_CACHE", "1") != "0"
 
 # Ensure directories exist
 DAILY_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple Moving Average over a 1-D array using a running sum (np.cumsum).
+    The first window-1 entries are NaN, matching rolling_mean.
+    Meant for single-ticker series where building a Polars/pandas rolling
+    plan costs more than the arithmetic itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if window <= 0 or len(values) < window:
+        return out
+
+    csum = np.cumsum(values)
+    out[window - 1] = csum[window - 1]
+    out[window:] = csum[window:] - csum[:-window]
+    out[window - 1 :] /= window
+    return out
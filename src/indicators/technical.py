@@ -61,8 +61,9 @@ def calculate_relative_volume(
     Calculate Relative Volume (RVOL).
     RVOL = Volume / Average Volume (SMA of Volume)
     """
-    # We calculate the rolling mean of volume first
-    avg_vol = pl.col(col_name).rolling_mean(window_size=period)
+    # We calculate the rolling mean of volume first, as an integer window sum
+    # (exact for share counts) divided by the period
+    avg_vol = pl.col(col_name).rolling_sum(window_size=period) / period
     
     return df.with_columns([
         avg_vol.alias(f"avg_volume_{period}"),
@@ -121,3 +122,37 @@ def add_common_indicators(lf: pl.LazyFrame) -> pl.LazyFrame:
     lf = calculate_sma(lf, 200)
     lf = calculate_rsi(lf, 14)
     return lf
+
+
+# Columns written by add_scanner_indicators. Names match the scanner filters'
+# indicator names at their default periods, so stored values can stand in
+# for computing them during a scan.
+SCANNER_INDICATOR_COLUMNS = [
+    "sma_50",
+    "sma_150",
+    "sma_200",
+    "sma_200_1m_ago",
+    "high_252",
+    "low_252",
+    "avg_volume_20",
+    "rvol_20",
+    "adr_20",
+    "prev_high",
+]
+
+
+def add_scanner_indicators(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Add the indicators used by the built-in scanner filters to a single
+    ticker's date-sorted history.
+    """
+    lf = calculate_sma(lf, 50)
+    lf = calculate_sma(lf, 150)
+    lf = calculate_sma(lf, 200)
+    lf = calculate_rolling_extrema(lf, 252)
+    lf = calculate_relative_volume(lf, 20)
+    lf = calculate_adr(lf, 20)
+    return lf.with_columns(
+        pl.col("sma_200").shift(20).alias("sma_200_1m_ago"),
+        pl.col("high").shift(1).alias("prev_high"),
+    )
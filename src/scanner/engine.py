@@ -1,67 +1,310 @@
+import hashlib
+import json
+import multiprocessing
+import operator
+import os
 import polars as pl
+import polars.selectors as cs
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import repeat
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional
 from src.config import DAILY_DATA_DIR
 from src.scanner.filters.base import BaseFilter
+from src.storage.parquet_store import FLOAT32_COLUMNS, ParquetStore
+
+# Stored columns every scan loads; filters ask for more via required_columns()
+BASE_COLUMNS = ["symbol", "date", "close", "volume"]
+
+
+def _stage_indicators(indicators: List[pl.Expr]) -> List[List[pl.Expr]]:
+    """
+    Deduplicate indicator expressions by output name (first one wins) and
+    group them into with_columns stages: an expression that reads another
+    indicator's column runs in a later stage than the one producing it.
+    """
+    unique = {}
+    for expr in indicators:
+        name = expr.meta.output_name(raise_if_undetermined=False)
+        unique.setdefault(name if name is not None else id(expr), expr)
+
+    pending = {
+        name: set(expr.meta.root_names()) & (unique.keys() - {name})
+        for name, expr in unique.items()
+    }
+    stages = []
+    done = set()
+    while pending:
+        ready = [name for name, deps in pending.items() if deps <= done]
+        if not ready:
+            # Circular references: leave them to Polars in one pass
+            ready = list(pending)
+        stages.append([unique[name] for name in ready])
+        done.update(ready)
+        for name in ready:
+            del pending[name]
+    return stages
+
+
+def _indicator_names(f: BaseFilter) -> set:
+    return {
+        expr.meta.output_name(raise_if_undetermined=False)
+        for expr in f.required_indicators()
+    }
+
+
+def _lookback_window(
+    filters: List[BaseFilter], precomputed: frozenset = frozenset()
+) -> Optional[int]:
+    """
+    Trailing bars per symbol needed by all filters, or None if any filter
+    needs the full history. A filter whose indicators are all stored in the
+    data only needs the last bar.
+    """
+    lookbacks = []
+    for f in filters:
+        names = _indicator_names(f)
+        lookbacks.append(1 if names and names <= precomputed else f.lookback())
+    if any(lookback is None for lookback in lookbacks):
+        return None
+    return max(lookbacks, default=1)
+
+
+def _scan_shard(
+    data_dir: Path, filters: List[BaseFilter], symbols: List[str]
+) -> pl.DataFrame:
+    # Runs in a worker process; opens its own store on the same directory.
+    return ScannerEngine(data_dir=data_dir).scan(filters, symbols)
 
 
 class ScannerEngine:
-    def __init__(self, data_dir: Path = DAILY_DATA_DIR):
+    def __init__(
+        self,
+        data_dir: Path = DAILY_DATA_DIR,
+        store: Optional[object] = None,
+        cache_dir: Optional[Path] = None,
+    ):
         self.data_dir = data_dir
+        # Any store exposing scan_all() (ParquetStore, DuckDBStore)
+        self.store = store if store is not None else ParquetStore(data_dir)
+        # Where to keep scan results between runs; None disables the cache
+        self.cache_dir = cache_dir
+
+    def _cache_path(
+        self, filters: List[BaseFilter], symbols: Optional[List[str]]
+    ) -> Optional[Path]:
+        """
+        Result cache file for this scan, or None if caching is off.
+        Files live in a directory per store data version, so any re-synced
+        ticker invalidates them; the name covers the filters and their
+        parameters and the symbol set (order does not matter).
+        """
+        data_version = getattr(self.store, "data_version", None)
+        if self.cache_dir is None or data_version is None:
+            return None
+
+        version = hashlib.sha1(data_version().encode()).hexdigest()
+        key = json.dumps(
+            {
+                "filters": [[type(f).__name__, vars(f)] for f in filters],
+                "symbols": sorted(symbols) if symbols is not None else None,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return self.cache_dir / version / f"{name}.parquet"
+
+    def _prune_cache(self, current: Path):
+        """
+        Remove cached results of older data versions; they can never be hit
+        again once the data has changed.
+        """
+        for entry in self.cache_dir.iterdir():
+            if entry == current:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+    def _cached(
+        self,
+        filters: List[BaseFilter],
+        symbols: Optional[List[str]],
+        run: Callable[[], pl.DataFrame],
+    ) -> pl.DataFrame:
+        path = self._cache_path(filters, symbols)
+        if path is None:
+            return run()
+        try:
+            return pl.read_parquet(path)
+        except (OSError, pl.exceptions.PolarsError):
+            pass
+
+        result = run()
+        if result.width > 0:
+            # Write then rename so a concurrent run never reads a partial file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            result.write_parquet(tmp)
+            os.replace(tmp, path)
+            self._prune_cache(path.parent)
+        return result
 
-    def scan(self, filters: List[BaseFilter]) -> pl.DataFrame:
+    def scan(
+        self, filters: List[BaseFilter], symbols: Optional[List[str]] = None
+    ) -> pl.DataFrame:
         """
-        Scan all parquet files for stocks matching criteria.
+        Scan all stored tickers for stocks matching criteria.
         Uses LazyFrames for efficiency.
         Accepts a list of Filter objects to apply.
+        If `symbols` is given, only those tickers are scanned.
+        Results are reused from the cache while the stored data is unchanged.
         """
-        # Scan all parquet files in the daily directory
+        if symbols is not None and not symbols:
+            return pl.DataFrame()
+
+        return self._cached(filters, symbols, lambda: self._scan(filters, symbols))
+
+    def _scan(
+        self, filters: List[BaseFilter], symbols: Optional[List[str]]
+    ) -> pl.DataFrame:
+        # All tickers from the store, with a symbol column
         try:
-            lf = pl.scan_parquet(
-                str(self.data_dir / "*.parquet"), include_file_paths="file_path"
-            )
+            lf = self.store.scan_all(symbols)
         except Exception:
             return pl.DataFrame()
 
-        # Extract symbol
-        lf = lf.with_columns(
-            pl.col("file_path")
-            .str.split("/")
-            .list.last()
-            .str.replace(".parquet", "")
-            .alias("symbol")
+        # Indicators the store already holds for every scanned ticker are read
+        # as columns instead of being recomputed.
+        precomputed_columns = getattr(self.store, "precomputed_columns", None)
+        precomputed = frozenset(
+            precomputed_columns(symbols) if precomputed_columns else ()
         )
 
+        # Load only the columns the filters use, so unused price columns
+        # (adj_*, dividends, splits) never leave storage whatever the optimizer
+        # decides.
+        columns = BASE_COLUMNS + [c for f in filters for c in f.required_columns()]
+        columns += sorted(set().union(*map(_indicator_names, filters)) & precomputed)
+        lf = lf.select(list(dict.fromkeys(columns)))
+
         # Sort by symbol and date
         lf = lf.sort(["symbol", "date"])
 
+        # Only the last row per symbol is reported, so rolling indicators only
+        # need each symbol's trailing `window` bars, not its full history.
+        window = _lookback_window(filters, precomputed)
+        if window is not None:
+            lf = lf.filter(
+                pl.int_range(pl.len()).over("symbol")
+                >= pl.len().over("symbol") - window
+            )
+
         # 1. Collect all required indicators from filters
-        # Use a dict/set to deduplicate based on expression string representation if needed,
-        # but Polars optimizer is generally good at this.
-        # We will simply collect all and let Polars optimize, or we can try to be smarter.
-        # For now, let's just flatten the list.
-        
+        # Filters sharing an indicator (same output name) compute it once, and
+        # derived indicators (e.g. rvol from avg_volume) reuse the column
+        # computed in an earlier stage instead of repeating the rolling window.
         indicators = []
         for f in filters:
             indicators.extend(f.required_indicators())
+        indicators = [
+            expr
+            for expr in indicators
+            if expr.meta.output_name(raise_if_undetermined=False) not in precomputed
+        ]
 
-        # If we have indicators, apply them
-        if indicators:
-            # Basic dedup by string representation might be useful to avoid clutter
-            # but simplest is just passing them.
-            lf = lf.with_columns(indicators)
+        for stage in _stage_indicators(indicators):
+            lf = lf.with_columns(stage)
 
         # 2. Filter: Last row per symbol
         # We must do this *after* rolling calculations (which happen in with_columns/over)
         # but *before* applying simple scalar filters usually.
         # However, our filters might need history? No, filters usually apply to the *current* state (last row).
         # Standard scanner logic: Calculate indicators on full history -> Take last row -> Check criteria.
-        
-        lf = lf.group_by("symbol").last()
+        # Rows are sorted by (symbol, date), so a symbol's last row is the one
+        # where the next row's symbol differs: one ordered pass, no hash group-by.
+        lf = lf.filter(pl.col("symbol").ne_missing(pl.col("symbol").shift(-1)))
 
         # 3. Apply Filters
-        for f in filters:
-            lf = f.apply(lf)
+        # AND all predicates into one filter node so the mask is evaluated in
+        # a single pass rather than relying on the optimizer to fuse N filters.
+        if filters:
+            lf = lf.filter(reduce(operator.and_, (f.predicate() for f in filters)))
+
+        # Fix the output schema: files with and without stored indicators (or
+        # from before the float32 change) otherwise yield different column
+        # orders and dtypes, which breaks concatenating per-shard results.
+        names = [
+            expr.meta.output_name(raise_if_undetermined=False)
+            for f in filters
+            for expr in f.required_indicators()
+        ]
+        order = cs.by_name(
+            *dict.fromkeys(
+                BASE_COLUMNS
+                + [c for f in filters for c in f.required_columns()]
+                + [name for name in names if name is not None]
+            ),
+            require_all=False,
+        )
+        lf = lf.select(order, cs.all() - order).with_columns(
+            cs.by_name(FLOAT32_COLUMNS, require_all=False).cast(pl.Float32),
+            (cs.float() - cs.by_name(FLOAT32_COLUMNS, require_all=False)).cast(
+                pl.Float64
+            ),
+        )
 
-        # Collect result
-        return lf.collect()
+        # Collect result with the streaming engine so the scan runs in batches
+        # with bounded memory; operators it cannot stream fall back in-memory.
+        return lf.collect(engine="streaming")
+
+    def scan_parallel(
+        self,
+        filters: List[BaseFilter],
+        symbols: Optional[List[str]] = None,
+        n_workers: Optional[int] = None,
+    ) -> pl.DataFrame:
+        """
+        Same as scan(), but shards the tickers across worker processes and
+        concatenates the per-shard results.
+        Only the parquet store is sharded; other stores fall back to scan().
+        """
+        if not isinstance(self.store, ParquetStore):
+            return self.scan(filters, symbols)
+
+        return self._cached(
+            filters, symbols, lambda: self._scan_sharded(filters, symbols, n_workers)
+        )
+
+    def _scan_sharded(
+        self,
+        filters: List[BaseFilter],
+        symbols: Optional[List[str]],
+        n_workers: Optional[int],
+    ) -> pl.DataFrame:
+        if symbols is None:
+            symbols = self.store.list_existing_tickers()
+        if n_workers is None:
+            n_workers = max(1, (os.cpu_count() or 1) // 2)
+        n_workers = min(n_workers, len(symbols))
+        if n_workers <= 1:
+            return self._scan(filters, symbols)
+
+        shards = [symbols[i::n_workers] for i in range(n_workers)]
+        # spawn rather than fork: Polars' thread pool is not fork-safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+            results = list(
+                pool.map(
+                    _scan_shard, repeat(self.store.data_dir), repeat(filters), shards
+                )
+            )
+
+        results = [df for df in results if df.width > 0]
+        if not results:
+            return pl.DataFrame()
+        return pl.concat(results).sort("symbol")
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 import polars as pl
 
 
@@ -9,12 +9,45 @@ class BaseFilter(ABC):
         """
         Return a list of Polars expressions (columns) needed for this filter.
         These expressions will be passed to `with_columns` by the engine before filtering.
+        Indicators with the same output name are computed once, and an expression
+        may reference another indicator's column by name (e.g. pl.col("sma_200")).
         """
         pass
 
+    def required_columns(self) -> List[str]:
+        """
+        Stored columns this filter reads, e.g. ["open", "high"].
+        The engine loads only the union of these (plus symbol, date, close and
+        volume) from storage. By default they are the columns referenced by
+        the indicator and predicate expressions, minus the indicators' own.
+        """
+        indicators = self.required_indicators()
+        outputs = {
+            expr.meta.output_name(raise_if_undetermined=False) for expr in indicators
+        }
+        roots = set(self.predicate().meta.root_names())
+        for expr in indicators:
+            roots.update(expr.meta.root_names())
+        return sorted(roots - outputs)
+
+    def lookback(self) -> Optional[int]:
+        """
+        Number of trailing bars per symbol the indicators need to be correct on
+        the last bar. The engine drops older rows before computing indicators.
+        None means the full history is required.
+        """
+        return None
+
     @abstractmethod
+    def predicate(self) -> pl.Expr:
+        """
+        Boolean expression selecting the rows that pass this filter.
+        The engine ANDs all filters' predicates into a single filter.
+        """
+        pass
+
     def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
         """
         Apply the filtering logic (filter/where clause).
         """
-        pass
+        return lf.filter(self.predicate())
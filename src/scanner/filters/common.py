@@ -10,8 +10,11 @@ class MinPriceFilter(BaseFilter):
     def required_indicators(self) -> List[pl.Expr]:
         return []
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
-        return lf.filter(pl.col("close") >= self.min_price)
+    def lookback(self) -> int:
+        return 1
+
+    def predicate(self) -> pl.Expr:
+        return pl.col("close") >= self.min_price
 
 
 class MinVolumeFilter(BaseFilter):
@@ -21,8 +24,11 @@ class MinVolumeFilter(BaseFilter):
     def required_indicators(self) -> List[pl.Expr]:
         return []
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
-        return lf.filter(pl.col("volume") >= self.min_volume)
+    def lookback(self) -> int:
+        return 1
+
+    def predicate(self) -> pl.Expr:
+        return pl.col("volume") >= self.min_volume
 
 
 class MinRVolFilter(BaseFilter):
@@ -31,23 +37,24 @@ class MinRVolFilter(BaseFilter):
         self.period = period
 
     def required_indicators(self) -> List[pl.Expr]:
-        # We need rvol calculation
         # rvol_20 = volume / sma(volume, 20)
-
-        # Define the expression for Average Volume
-        avg_vol_expr = pl.col("volume").rolling_mean(self.period).over("symbol")
-
-        # Return two expressions:
-        # 1. The Average Volume column itself (useful to see)
-        # 2. The RVOL column (calculated using the expression, NOT by referencing the column name)
-        #    This ensures we don't hit "Column not found" errors in a single with_columns() call.
+        # The engine computes avg_volume first and rvol from that column, so
+        # the rolling mean is evaluated once even if other filters need it.
+        avg_vol_name = f"avg_volume_{self.period}"
+        # Volume is integral, so an integer window sum is exact and cheaper
+        # than a float rolling mean.
         return [
-            avg_vol_expr.alias(f"avg_volume_{self.period}"),
-            (pl.col("volume") / avg_vol_expr).alias(f"rvol_{self.period}"),
+            (pl.col("volume").rolling_sum(self.period) / self.period)
+            .over("symbol")
+            .alias(avg_vol_name),
+            (pl.col("volume") / pl.col(avg_vol_name)).alias(f"rvol_{self.period}"),
         ]
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
-        return lf.filter(pl.col(f"rvol_{self.period}") >= self.min_rvol)
+    def lookback(self) -> int:
+        return self.period
+
+    def predicate(self) -> pl.Expr:
+        return pl.col(f"rvol_{self.period}") >= self.min_rvol
 
 
 class MinAdrFilter(BaseFilter):
@@ -65,5 +72,8 @@ class MinAdrFilter(BaseFilter):
         )
         return [adr]
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
-        return lf.filter(pl.col(f"adr_{self.period}") >= self.min_adr)
+    def lookback(self) -> int:
+        return self.period
+
+    def predicate(self) -> pl.Expr:
+        return pl.col(f"adr_{self.period}") >= self.min_adr
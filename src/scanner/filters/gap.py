@@ -16,6 +16,9 @@ class GapUpFilter(BaseFilter):
         prev_high = pl.col("high").shift(1).over("symbol").alias("prev_high")
         return [prev_high]
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+    def lookback(self) -> int:
+        return 2
+
+    def predicate(self) -> pl.Expr:
         threshold_factor = 1 + (self.threshold_pct / 100)
-        return lf.filter(pl.col("open") > pl.col("prev_high") * threshold_factor)
+        return pl.col("open") > pl.col("prev_high") * threshold_factor
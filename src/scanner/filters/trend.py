@@ -3,6 +3,21 @@ from typing import List
 from src.scanner.filters.base import BaseFilter
 
 
+def _last_bars(column: str, bars: int, skip: int = 0) -> pl.Expr:
+    """
+    The `bars` values of `column` ending `skip` bars before the latest one.
+    """
+    return pl.col(column).slice(-(bars + skip), bars)
+
+
+def _trailing(agg: pl.Expr, min_bars: int) -> pl.Expr:
+    """
+    Per-symbol aggregate broadcast to the symbol's rows; null when it has
+    fewer than `min_bars` bars, as a rolling window of that size would be.
+    """
+    return pl.when(pl.len() >= min_bars).then(agg).over("symbol")
+
+
 class TrendTemplateFilter(BaseFilter):
     def required_indicators(self) -> List[pl.Expr]:
         # Required for Minervini Trend Template:
@@ -11,27 +26,33 @@ class TrendTemplateFilter(BaseFilter):
         # 52-week Low (low_252)
         # 52-week High (high_252)
 
+        # Only the last bar is checked, so each value is a single aggregate
+        # over the symbol's trailing bars (broadcast to its rows) rather than
+        # a rolling window evaluated on every bar.
         return [
-            pl.col("close").rolling_mean(50).over("symbol").alias("sma_50"),
-            pl.col("close").rolling_mean(150).over("symbol").alias("sma_150"),
-            pl.col("close").rolling_mean(200).over("symbol").alias("sma_200"),
-            pl.col("low").rolling_min(252).over("symbol").alias("low_252"),
-            pl.col("high").rolling_max(252).over("symbol").alias("high_252"),
-            # For "SMA200 trending up", we need the shifted value.
-            # However, we can only shift *after* sma_200 is available if we do it in one pass,
-            # or we can define it as a nested expression.
-            # In Polars, we can define dependencies.
-            pl.col("close").rolling_mean(200).over("symbol").shift(20).over("symbol").alias("sma_200_1m_ago")
+            _trailing(_last_bars("close", 50).mean(), 50).alias("sma_50"),
+            _trailing(_last_bars("close", 150).mean(), 150).alias("sma_150"),
+            _trailing(_last_bars("close", 200).mean(), 200).alias("sma_200"),
+            _trailing(_last_bars("low", 252).min(), 252).alias("low_252"),
+            _trailing(_last_bars("high", 252).max(), 252).alias("high_252"),
+            # For "SMA200 trending up": the 200-bar mean ending 20 bars ago
+            _trailing(_last_bars("close", 200, skip=20).mean(), 220).alias(
+                "sma_200_1m_ago"
+            ),
         ]
 
-    def apply(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+    def lookback(self) -> int:
+        # 52-week extremes need 252 bars; sma_200 shifted by 20 needs 220
+        return 252
+
+    def predicate(self) -> pl.Expr:
         # Minervini Trend Template Criteria:
         # 1. Price > SMA50 > SMA150 > SMA200
         # 2. SMA200 is trending up (Current > 1 month ago)
         # 3. Price > 52-week Low + 25% (1.25 * Low)
         # 4. Price within 25% of 52-week High (Price > 0.75 * High)
 
-        return lf.filter(
+        return (
             (pl.col("close") > pl.col("sma_50")) &
             (pl.col("sma_50") > pl.col("sma_150")) &
             (pl.col("sma_150") > pl.col("sma_200")) &
@@ -1,4 +1,6 @@
+import copy
 import yaml
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional
 from rich.console import Console
@@ -7,6 +9,18 @@ console = Console()
 RECIPES_DIR = Path("recipes")
 RECIPES_DIR.mkdir(exist_ok=True)
 
+# libyaml's C loader/dumper when PyYAML was built with it; same safe subset,
+# much faster
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+@lru_cache(maxsize=64)
+def _parse_recipe(path: Path, mtime_ns: int) -> Dict[str, Any]:
+    # Keyed on mtime so an edited recipe is re-parsed, not served stale.
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=_Loader) or {}
+
 
 class RecipeManager:
     @staticmethod
@@ -29,8 +43,9 @@ class RecipeManager:
                 return {}
 
         try:
-            with open(path, "r") as f:
-                return yaml.safe_load(f) or {}
+            config = _parse_recipe(path.resolve(), path.stat().st_mtime_ns)
+            # Callers may modify the config; keep the cached copy intact
+            return copy.deepcopy(config)
         except Exception as e:
             console.print(f"[red]Error loading recipe {path}: {e}[/red]")
             return {}
@@ -50,7 +65,13 @@ class RecipeManager:
 
         try:
             with open(path, "w") as f:
-                yaml.dump(config, f, default_flow_style=False)
+                yaml.dump(
+                    config,
+                    f,
+                    Dumper=_Dumper,
+                    default_flow_style=False,
+                    sort_keys=False,
+                )
             console.print(f"[green]Recipe saved to {path}[/green]")
         except Exception as e:
             console.print(f"[red]Error saving recipe to {path}: {e}[/red]")
@@ -0,0 +1,165 @@
+import threading
+import duckdb
+import polars as pl
+from datetime import date
+from pathlib import Path
+from typing import Optional
+from src.config import DUCKDB_PATH
+
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+
+class DuckDBStore:
+    """
+    Store all tickers in a single DuckDB table instead of one parquet file per symbol.
+    Exposes the same interface as ParquetStore so the CLI can swap backends.
+    """
+
+    def __init__(self, db_path: Path = DUCKDB_PATH):
+        self.db_path = db_path
+        self.con = duckdb.connect(str(db_path))
+        # A DuckDB connection is not safe for concurrent use across threads,
+        # and sync_all writes from a thread pool.
+        self._lock = threading.Lock()
+        self.con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prices (
+                symbol VARCHAR,
+                date DATE,
+                open DOUBLE,
+                high DOUBLE,
+                low DOUBLE,
+                close DOUBLE,
+                volume BIGINT,
+                PRIMARY KEY (symbol, date)
+            )
+            """
+        )
+
+    def save_ticker_data(self, symbol: str, df: pl.DataFrame):
+        """
+        Upsert rows for a symbol. Existing (symbol, date) rows are replaced.
+        """
+        with self._lock:
+            self.con.register("tmp", df.select(PRICE_COLUMNS).to_arrow())
+            try:
+                self.con.execute(
+                    "INSERT OR REPLACE INTO prices "
+                    "SELECT ?, date, open, high, low, close, volume FROM tmp",
+                    [symbol.upper()],
+                )
+            finally:
+                self.con.unregister("tmp")
+
+    def append_ticker_data(self, symbol: str, df: pl.DataFrame):
+        """
+        Upsert newly fetched bars into the stored history.
+        """
+        self.save_ticker_data(symbol, df)
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        with self._lock:
+            row = self.con.execute(
+                "SELECT max(date) FROM prices WHERE symbol = ?", [symbol.upper()]
+            ).fetchone()
+        return row[0]
+
+    def load_ticker_data(self, symbol: str) -> pl.DataFrame:
+        with self._lock:
+            df = self.con.execute(
+                f"SELECT {', '.join(PRICE_COLUMNS)} FROM prices "
+                "WHERE symbol = ? ORDER BY date",
+                [symbol.upper()],
+            ).pl()
+        if df.is_empty():
+            raise FileNotFoundError(f"Data for {symbol} not found.")
+        return df
+
+    def scan_ticker_data(
+        self, symbol: str, columns: Optional[list[str]] = None
+    ) -> pl.LazyFrame:
+        df = self.load_ticker_data(symbol)
+        return df.lazy().select(columns or PRICE_COLUMNS)
+
+    def scan_all(self, symbols: Optional[list[str]] = None) -> pl.LazyFrame:
+        """
+        All tickers (or only `symbols`) as one LazyFrame with a `symbol` column,
+        for the scanner. The query runs when the frame is collected, with the
+        scanner's column selection pushed into it.
+        """
+        # The frame is collected after the lock is released, so give it its
+        # own cursor rather than the shared connection.
+        with self._lock:
+            cursor = self.con.cursor()
+        if symbols is None:
+            rel = cursor.sql("SELECT * FROM prices")
+        else:
+            rel = cursor.sql(
+                "SELECT * FROM prices WHERE list_contains($symbols, symbol)",
+                params={"symbols": symbols},
+            )
+        return rel.pl(lazy=True)
+
+    def latest_rows(
+        self, min_price: Optional[float] = None, min_volume: Optional[float] = None
+    ) -> pl.DataFrame:
+        """
+        Last bar of every ticker whose close/volume pass the given floors.
+        """
+        conditions = []
+        params: list = []
+        if min_price is not None:
+            conditions.append("close >= ?")
+            params.append(min_price)
+        if min_volume is not None:
+            conditions.append("volume >= ?")
+            params.append(min_volume)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # The latest row is picked first; the floors apply to that row only.
+        query = f"""
+            SELECT * FROM (
+                SELECT symbol, date, close, volume
+                FROM prices
+                QUALIFY row_number() OVER (PARTITION BY symbol ORDER BY date DESC) = 1
+            )
+            {where}
+        """
+        with self._lock:
+            return self.con.execute(query, params).pl()
+
+    def dollar_volumes(
+        self, lookback_days: int, symbols: Optional[list[str]] = None
+    ) -> pl.DataFrame:
+        """
+        Sum of close * volume per ticker over the `lookback_days` calendar days
+        ending at that ticker's last bar.
+        """
+        symbol_filter = "" if symbols is None else "WHERE list_contains(?, symbol)"
+        params: list = [] if symbols is None else [symbols]
+        query = f"""
+            SELECT symbol, sum(close * volume)::DOUBLE AS dollar_volume
+            FROM (
+                SELECT symbol, date, close, volume
+                FROM prices
+                {symbol_filter}
+                QUALIFY date >= max(date) OVER (PARTITION BY symbol) - ?::INTEGER
+            )
+            GROUP BY symbol
+        """
+        with self._lock:
+            return self.con.execute(query, params + [lookback_days]).pl()
+
+    def exists(self, symbol: str) -> bool:
+        with self._lock:
+            row = self.con.execute(
+                "SELECT 1 FROM prices WHERE symbol = ? LIMIT 1", [symbol.upper()]
+            ).fetchone()
+        return row is not None
+
+    def list_existing_tickers(self) -> list[str]:
+        with self._lock:
+            rows = self.con.execute(
+                "SELECT DISTINCT symbol FROM prices ORDER BY symbol"
+            ).fetchall()
+        return [r[0] for r in rows]
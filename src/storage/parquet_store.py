@@ -1,22 +1,175 @@
+import duckdb
+import os
 import polars as pl
+import pyarrow.parquet as pq
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 from src.config import DAILY_DATA_DIR
+from src.indicators.technical import SCANNER_INDICATOR_COLUMNS, add_scanner_indicators
+
+# Hive layout: data_dir/symbol=AAPL/data.parquet. Readers get `symbol` as a
+# partition column and can skip whole files when filtering on it.
+PARTITION_FILE = "data.parquet"
+
+# Price columns are stored as float32: ample precision for quotes and half
+# the bytes per rolling-window pass. Volumes stay int64, since split-adjusted
+# volumes can exceed the uint32 range.
+FLOAT32_COLUMNS = [
+    "open",
+    "high",
+    "low",
+    "close",
+    "adjOpen",
+    "adjHigh",
+    "adjLow",
+    "adjClose",
+]
+
+# Files written before the float32 change hold float64 prices; let one scan
+# read both.
+_SCAN_CAST_OPTIONS = pl.ScanCastOptions(float_cast=["upcast", "downcast"])
+
+
+@lru_cache(maxsize=1024)
+def _read_footer(path: str, mtime_ns: int, size: int) -> pq.FileMetaData:
+    # Keyed on mtime/size so a rewritten file is re-read rather than served stale.
+    return pq.read_metadata(path)
+
 
 class ParquetStore:
     def __init__(self, data_dir: Path = DAILY_DATA_DIR):
         self.data_dir = data_dir
+        self._con: Optional[duckdb.DuckDBPyConnection] = None
+        self._migrate_flat_files()
+
+    def _migrate_flat_files(self):
+        """
+        Move files from the old flat layout (data_dir/AAPL.parquet) into their
+        symbol partition. Only touches files still in the old layout.
+        """
+        for old_path in self.data_dir.glob("*.parquet"):
+            new_path = self.get_file_path(old_path.stem)
+            if new_path.exists():
+                continue
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            old_path.replace(new_path)
+
+    @property
+    def con(self) -> duckdb.DuckDBPyConnection:
+        # One in-memory DuckDB connection per store, so its parquet metadata
+        # cache survives across queries.
+        if self._con is None:
+            self._con = duckdb.connect()
+            self._con.execute("SET parquet_metadata_cache = true")
+        return self._con
+
+    def _metadata(self, file_path: Path) -> pq.FileMetaData:
+        stat = file_path.stat()
+        return _read_footer(str(file_path), stat.st_mtime_ns, stat.st_size)
 
     def get_file_path(self, symbol: str) -> Path:
-        return self.data_dir / f"{symbol.upper()}.parquet"
+        return self.data_dir / f"symbol={symbol.upper()}" / PARTITION_FILE
+
+    def _all_files(self) -> list[Path]:
+        return sorted(self.data_dir.glob(f"symbol=*/{PARTITION_FILE}"))
 
-    def save_ticker_data(self, symbol: str, df: pl.DataFrame):
+    def save_ticker_data(self, symbol: str, data: pl.DataFrame | pl.LazyFrame):
         """
         Save dataframe to parquet.
-        If file exists, we could implement merge logic, but for MVP we overwrite 
-        or we assume the fetcher got everything we needed.
+        Accepts a LazyFrame too, which is streamed to disk with sink_parquet
+        instead of being materialized first.
+        Overwrites any existing file; use append_ticker_data to merge new bars
+        into the stored history.
         """
         file_path = self.get_file_path(symbol)
-        df.write_parquet(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        lf = data.lazy().sort("date")
+        columns = set(lf.collect_schema().names())
+        # Store the scanner's indicators next to the prices so a scan can
+        # read them instead of recomputing every rolling window.
+        if {"high", "low", "close", "volume"} <= columns:
+            lf = add_scanner_indicators(lf)
+        prices = [c for c in FLOAT32_COLUMNS if c in columns]
+        lf = lf.with_columns(pl.col(prices).cast(pl.Float32))
+
+        # Write next to the target and rename, so readers never see a partial
+        # file and an append can stream from the file it replaces.
+        # Date-sorted rows give tight per-row-group min/max statistics, which
+        # DuckDB and Polars use to skip row groups on date filters. 8192 rows
+        # (~30 years of daily bars) keeps most tickers in one row group while
+        # letting long histories skip their oldest decades.
+        tmp_path = file_path.with_name(f".{PARTITION_FILE}.{os.getpid()}.tmp")
+        try:
+            lf.sink_parquet(
+                tmp_path,
+                compression="zstd",
+                compression_level=3,
+                statistics=True,
+                row_group_size=8192,
+            )
+            os.replace(tmp_path, file_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def append_ticker_data(self, symbol: str, df: pl.DataFrame):
+        """
+        Merge newly fetched bars into the stored history and save it.
+        Bars for dates already on disk are replaced by the new ones.
+        """
+        if not self.exists(symbol):
+            self.save_ticker_data(symbol, df)
+            return
+
+        last = self.last_date(symbol)
+        file_path = self.get_file_path(symbol)
+        # Stored indicators are recomputed by save_ticker_data; read prices only
+        price_columns = [
+            c
+            for c in self._metadata(file_path).schema.names
+            if c not in SCANNER_INDICATOR_COLUMNS
+        ]
+        existing = pl.scan_parquet(file_path, hive_partitioning=False).select(
+            price_columns
+        )
+        merged = pl.concat([existing, df.lazy().sort("date")], how="diagonal_relaxed")
+        if last is None or df["date"].min() <= last:
+            # New bars overlap the stored range: replace the stale rows
+            merged = merged.unique(
+                subset="date", keep="last", maintain_order=True
+            ).sort("date")
+        # Otherwise the bars strictly follow the history (the normal
+        # incremental sync), so a plain concat is already unique and sorted.
+
+        self.save_ticker_data(symbol, merged)
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        """
+        Latest stored date for a symbol, or None if nothing is stored.
+        Read from the parquet footer statistics, so no data pages are decoded.
+        """
+        file_path = self.get_file_path(symbol)
+        if not file_path.exists():
+            return None
+
+        metadata = self._metadata(file_path)
+        date_idx = metadata.schema.to_arrow_schema().get_field_index("date")
+        maxes = []
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(date_idx).statistics
+            if stats is None or not stats.has_min_max:
+                # Footer without statistics: fall back to reading the column
+                return (
+                    pl.scan_parquet(file_path)
+                    .select(pl.col("date").max())
+                    .collect()
+                    .item()
+                )
+            maxes.append(stats.max)
+
+        return max(maxes) if maxes else None
 
     def load_ticker_data(self, symbol: str) -> pl.DataFrame:
         """
@@ -25,11 +178,147 @@ class ParquetStore:
         file_path = self.get_file_path(symbol)
         if not file_path.exists():
             raise FileNotFoundError(f"Data for {symbol} not found.")
-        
-        return pl.read_parquet(file_path)
+
+        # Reuse the cached footer instead of parsing it again on open
+        metadata = self._metadata(file_path)
+        parquet_file = pq.ParquetFile(file_path, metadata=metadata)
+        # Stored indicators are recomputed on save; callers get the prices
+        columns = [
+            c for c in metadata.schema.names if c not in SCANNER_INDICATOR_COLUMNS
+        ]
+        return pl.from_arrow(parquet_file.read(columns=columns))
+
+    def scan_ticker_data(
+        self, symbol: str, columns: Optional[list[str]] = None
+    ) -> pl.LazyFrame:
+        """
+        Lazy version of load_ticker_data, reading only `columns` (default: the
+        stored price columns). Slices and filters applied downstream are
+        pushed into the parquet reader.
+        """
+        file_path = self.get_file_path(symbol)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Data for {symbol} not found.")
+
+        if columns is None:
+            columns = [
+                c
+                for c in self._metadata(file_path).schema.names
+                if c not in SCANNER_INDICATOR_COLUMNS
+            ]
+        return pl.scan_parquet(file_path, hive_partitioning=False).select(columns)
+
+    def scan_all(self, symbols: Optional[list[str]] = None) -> pl.LazyFrame:
+        """
+        All tickers (or only `symbols`) as one LazyFrame with a `symbol` column,
+        for the scanner. The symbol is the hive partition column.
+        """
+        if symbols is None:
+            paths = self._all_files()
+        else:
+            paths = [self.get_file_path(s) for s in symbols]
+        return pl.scan_parquet(
+            paths,
+            hive_partitioning=True,
+            hive_schema={"symbol": pl.String},
+            cast_options=_SCAN_CAST_OPTIONS,
+            # Files saved before indicators were stored lack those columns
+            missing_columns="insert",
+            extra_columns="ignore",
+        )
+
+    def precomputed_columns(self, symbols: Optional[list[str]] = None) -> set[str]:
+        """
+        Stored indicator columns present in every file being scanned, read
+        from the cached parquet footers.
+        """
+        if symbols is None:
+            paths = self._all_files()
+        else:
+            paths = [p for p in map(self.get_file_path, symbols) if p.exists()]
+        if not paths:
+            return set()
+
+        common = set(SCANNER_INDICATOR_COLUMNS)
+        for path in paths:
+            common &= set(self._metadata(path).schema.names)
+            if not common:
+                break
+        return common
+
+    def latest_rows(
+        self, min_price: Optional[float] = None, min_volume: Optional[float] = None
+    ) -> pl.DataFrame:
+        """
+        Last bar of every ticker whose close/volume pass the given floors.
+        Runs as a single DuckDB scan over all files so the work is vectorized
+        and parallel instead of one polars read per ticker.
+        """
+        paths = self._all_files()
+        if not paths:
+            return pl.DataFrame(schema={"symbol": pl.String})
+
+        conditions = []
+        params: list = [[str(p) for p in paths]]
+        if min_price is not None:
+            conditions.append("close >= ?")
+            params.append(min_price)
+        if min_volume is not None:
+            conditions.append("volume >= ?")
+            params.append(min_volume)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # The latest row is picked first; the floors apply to that row only.
+        query = f"""
+            SELECT * FROM (
+                SELECT symbol, date, close, volume
+                FROM read_parquet(?, hive_partitioning=true, hive_types={{'symbol': VARCHAR}})
+                QUALIFY row_number() OVER (PARTITION BY symbol ORDER BY date DESC) = 1
+            )
+            {where}
+        """
+        return self.con.execute(query, params).pl()
+
+    def dollar_volumes(
+        self, lookback_days: int, symbols: Optional[list[str]] = None
+    ) -> pl.DataFrame:
+        """
+        Sum of close * volume per ticker over the `lookback_days` calendar days
+        ending at that ticker's last bar. One DuckDB query over all files.
+        """
+        if symbols is None:
+            paths = self._all_files()
+        else:
+            paths = [p for p in map(self.get_file_path, symbols) if p.exists()]
+        if not paths:
+            return pl.DataFrame(
+                schema={"symbol": pl.String, "dollar_volume": pl.Float64}
+            )
+        source = [str(p) for p in paths]
+
+        query = """
+            SELECT symbol, sum(close * volume)::DOUBLE AS dollar_volume
+            FROM (
+                SELECT symbol, date, close, volume
+                FROM read_parquet(?, hive_partitioning=true, hive_types={'symbol': VARCHAR})
+                QUALIFY date >= max(date) OVER (PARTITION BY symbol) - ?::INTEGER
+            )
+            GROUP BY symbol
+        """
+        return self.con.execute(query, [source, lookback_days]).pl()
+
+    def data_version(self) -> str:
+        """
+        Changes whenever a ticker file is added, removed or rewritten.
+        Used by the scanner's result cache.
+        """
+        stats = [path.stat() for path in self._all_files()]
+        newest = max((st.st_mtime_ns for st in stats), default=0)
+        total_size = sum(st.st_size for st in stats)
+        return f"{self.data_dir.resolve()}:{len(stats)}:{newest}:{total_size}"
 
     def exists(self, symbol: str) -> bool:
         return self.get_file_path(symbol).exists()
-    
+
     def list_existing_tickers(self) -> list[str]:
-        return [f.stem for f in self.data_dir.glob("*.parquet")]
+        return [f.parent.name.removeprefix("symbol=") for f in self._all_files()]
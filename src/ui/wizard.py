@@ -1,6 +1,24 @@
 import questionary
+import re
 from typing import Dict, Any
 
+# Decimal number, optionally negative (e.g. a gap-down threshold); checked
+# at the prompt instead of after the form
+_NUMBER = re.compile(r"-?(\d+(\.\d*)?|\.\d+)")
+
+# Filters that take a numeric threshold: key -> (prompt, default)
+VALUE_PROMPTS = {
+    "min_price": ("Minimum Price ($):", "10.0"),
+    "min_volume": ("Minimum Volume:", "1000000"),
+    "min_relative_volume": ("Minimum RVOL (e.g., 1.5):", "1.5"),
+    "min_adr": ("Minimum ADR % (e.g., 3.5):", "3.5"),
+    "gap_up": ("Minimum Gap Up % (e.g., 2.0):", "2.0"),
+}
+
+
+def _validate_number(text: str) -> bool | str:
+    return bool(_NUMBER.fullmatch(text.strip())) or "Please enter a number"
+
 
 def run_scan_wizard() -> Dict[str, Any]:
     """
@@ -26,31 +44,17 @@ def run_scan_wizard() -> Dict[str, Any]:
     if selected_filters is None:
         return {}
 
-    # 2. Ask for values for selected filters
-    if "min_price" in selected_filters:
-        config["min_price"] = float(
-            questionary.text("Minimum Price ($):", default="10.0").ask()
-        )
-
-    if "min_volume" in selected_filters:
-        config["min_volume"] = float(
-            questionary.text("Minimum Volume:", default="1000000").ask()
-        )
-
-    if "min_relative_volume" in selected_filters:
-        config["min_relative_volume"] = float(
-            questionary.text("Minimum RVOL (e.g., 1.5):", default="1.5").ask()
-        )
-
-    if "min_adr" in selected_filters:
-        config["min_adr"] = float(
-            questionary.text("Minimum ADR % (e.g., 3.5):", default="3.5").ask()
-        )
-
-    if "gap_up" in selected_filters:
-        config["gap_up"] = float(
-            questionary.text("Minimum Gap Up % (e.g., 2.0):", default="2.0").ask()
-        )
+    # 2. Ask for values for selected filters, as one form
+    questions = {
+        key: questionary.text(message, default=default, validate=_validate_number)
+        for key, (message, default) in VALUE_PROMPTS.items()
+        if key in selected_filters
+    }
+    if questions:
+        answers = questionary.form(**questions).ask()
+        if not answers:
+            return {}
+        config.update({key: float(value) for key, value in answers.items()})
 
     if "trend_template" in selected_filters:
         config["trend_template"] = True
@@ -3,6 +3,12 @@ import pandas as pd
 import re
 from lightweight_charts import Chart
 from datetime import timedelta
+from src.indicators.fast import sma
+
+# Lookback periods like "6mo", "1y", "2w"
+_PERIOD_RE = re.compile(r"(\d+)([a-z]+)")
+# Days per period unit, keyed by the unit's first letter
+_UNIT_DAYS = {"y": 365, "m": 30, "w": 7, "d": 1}
 
 
 class Plotter:
@@ -16,16 +22,21 @@ class Plotter:
         Helper method to filter and resample data.
         Returns a Pandas DataFrame ready for Lightweight Charts.
         """
+        # Build one lazy plan so the period filter, sort and resample run as a
+        # single optimized query.
+        lf = df.lazy()
+
         # 1. Filter by period
         if period:
             end_date = df["date"].max()
             start_date = self._calculate_start_date(end_date, period)
-            df = df.filter(pl.col("date") >= start_date)
+            lf = lf.filter(pl.col("date") >= start_date)
+
+        lf = lf.sort("date")
 
         # 2. Resample if needed (Polars)
         if resample:
-            df = df.sort("date")
-            q = df.group_by_dynamic("date", every=resample).agg(
+            lf = lf.group_by_dynamic("date", every=resample).agg(
                 [
                     pl.col("open").first(),
                     pl.col("high").max(),
@@ -34,18 +45,17 @@ class Plotter:
                     pl.col("volume").sum(),
                 ]
             )
-            df = q.collect() if isinstance(q, pl.LazyFrame) else q
 
         # 3. Prepare for Lightweight Charts
-        pdf = df.to_pandas()
-
-        if "date" in pdf.columns:
-            pdf = pdf.rename(columns={"date": "time"})
-
-        pdf = pdf.sort_values("time")
-        pdf["time"] = pd.to_datetime(pdf["time"]).astype("datetime64[ns]")
+        # Convert the date in Polars so to_pandas() already yields
+        # datetime64[ns] instead of re-parsing the column in pandas.
+        df = (
+            lf.rename({"date": "time"})
+            .with_columns(pl.col("time").cast(pl.Datetime("ns")))
+            .collect()
+        )
 
-        return pdf
+        return df.to_pandas()
 
     def _add_series_to_chart(
         self,
@@ -69,14 +79,14 @@ class Plotter:
 
         # 4. Indicators
         if len(pdf) > 50:
-            sma50 = pdf["close"].rolling(window=50).mean()
+            sma50 = sma(pdf["close"].to_numpy(), 50)
             line50 = chart_obj.create_line(
                 name="SMA 50", color="rgba(255, 235, 59, 0.7)"
             )
             line50.set(pd.DataFrame({"time": pdf["time"], "SMA 50": sma50}).dropna())
 
         if len(pdf) > 200:
-            sma200 = pdf["close"].rolling(window=200).mean()
+            sma200 = sma(pdf["close"].to_numpy(), 200)
             line200 = chart_obj.create_line(
                 name="SMA 200", color="rgba(255, 255, 255, 0.5)"
             )
@@ -148,21 +158,11 @@ class Plotter:
     def _calculate_start_date(self, end_date, period: str):
         # specific parsing for period string
         # simple implementation
-        match = re.match(r"(\d+)([a-z]+)", period)
+        match = _PERIOD_RE.match(period)
         if not match:
             return end_date - timedelta(days=365)  # default 1y fallback
 
         val, unit = int(match.group(1)), match.group(2)
-
-        if unit.startswith("y"):
-            days = val * 365
-        elif unit.startswith("m"):  # month
-            days = val * 30
-        elif unit.startswith("w"):
-            days = val * 7
-        elif unit.startswith("d"):
-            days = val
-        else:
-            days = 365
+        days = val * _UNIT_DAYS[unit[0]] if unit[0] in _UNIT_DAYS else 365
 
         return end_date - timedelta(days=days)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import polars as pl
+import requests
+from polars.testing import assert_frame_equal
+
+from src.api.cache import FileCache
+from src.api.tiingo import TiingoClient
+from src.storage.parquet_store import ParquetStore
+
+
+def _frame(close: float) -> pl.DataFrame:
+    return pl.DataFrame({"date": [date(2026, 1, 1)], "close": [close]})
+
+
+def _age(path, hours: float) -> None:
+    mtime = time.time() - hours * 3600
+    os.utime(path, (mtime, mtime))
+
+
+def test_cache_entries_expire_after_ttl(tmp_path):
+    cache = FileCache(tmp_path, ttl=timedelta(hours=1))
+    cache.set("AAA", _frame(10.0), "2026-01-01")
+
+    assert_frame_equal(cache.get("AAA", "2026-01-01"), _frame(10.0))
+    assert cache.get("AAA", "2026-01-02") is None
+
+    path = cache._path("AAA", "2026-01-01")
+    _age(path, 2)
+    assert cache.get("AAA", "2026-01-01") is None
+    # Expired entries are deleted on read
+    assert not path.exists()
+
+
+def test_cache_write_leaves_no_partial_files(tmp_path, monkeypatch):
+    cache = FileCache(tmp_path)
+    cache.set("AAA", _frame(10.0), "2026-01-01")
+
+    def fail_write(self, file, *args, **kwargs):
+        # Fail halfway through writing the temporary file
+        with open(file, "wb") as f:
+            f.write(b"PAR1")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pl.DataFrame, "write_parquet", fail_write)
+    cache.set("AAA", _frame(11.0), "2026-01-01")
+
+    # The old entry is untouched and no temporary file is left behind
+    assert_frame_equal(cache.get("AAA", "2026-01-01"), _frame(10.0))
+    assert [p.name for p in (tmp_path / "AAA").iterdir()] == [
+        cache._path("AAA", "2026-01-01").name
+    ]
+
+
+def test_cache_prune_deletes_only_expired_entries(tmp_path):
+    cache = FileCache(tmp_path, ttl=timedelta(hours=1))
+    cache.set("AAA", _frame(10.0), "2026-01-01")
+    cache.set("BBB", _frame(20.0), "2026-01-01")
+    _age(cache._path("AAA", "2026-01-01"), 2)
+
+    cache.prune()
+
+    assert not cache._path("AAA", "2026-01-01").exists()
+    assert cache._path("BBB", "2026-01-01").exists()
+
+    # Without a TTL nothing ever expires
+    _age(cache._path("BBB", "2026-01-01"), 1000)
+    FileCache(tmp_path, ttl=None).prune()
+    assert cache._path("BBB", "2026-01-01").exists()
+
+
+def test_adjustment_refetch_bypasses_cache(tmp_path, monkeypatch):
+    import src.cli as cli
+
+    store = ParquetStore(tmp_path / "daily")
+    store.save_ticker_data(
+        "AAA",
+        pl.DataFrame(
+            {
+                "date": [date(2026, 1, 1)],
+                "close": [100.0],
+                "volume": [1000],
+            }
+        ),
+    )
+    monkeypatch.setattr(cli, "store", store)
+
+    cache = FileCache(tmp_path / "cache")
+    client = TiingoClient(api_key="test", cache=cache)
+    # A full history cached before the split
+    stale = pl.DataFrame(
+        {
+            "date": [date(2026, 1, 1), date(2026, 1, 2)],
+            "close": [100.0, 101.0],
+            "volume": [1000, 1000],
+        }
+    )
+    cache.set("AAA", stale, cli.FULL_HISTORY_START)
+
+    # Tiingo now serves the split-adjusted history
+    responses = {
+        "2026-01-02": b"date,close,volume,splitFactor\n2026-01-02,50.5,2000,2.0\n",
+        cli.FULL_HISTORY_START: (
+            b"date,close,volume\n2026-01-01,50.0,2000\n2026-01-02,50.5,2000\n"
+        ),
+    }
+    requested = []
+
+    class Body(io.BytesIO):
+        pass
+
+    @contextmanager
+    def send(prepped, **kwargs):
+        start_date = parse_qs(urlsplit(prepped.url).query)["startDate"][0]
+        requested.append(start_date)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = Body(responses[start_date])
+        yield response
+
+    monkeypatch.setattr(client.session, "send", send)
+    _, success, _ = cli._sync_one_ticker("AAA", client)
+
+    assert success
+    assert requested == ["2026-01-02", cli.FULL_HISTORY_START]
+    assert store.load_ticker_data("AAA")["close"].to_list() == [50.0, 50.5]
+    # The fresh history replaces the stale cache entry
+    cached = cache.get("AAA", cli.FULL_HISTORY_START)
+    assert cached["close"].to_list() == [50.0, 50.5]
@@ -3,11 +3,13 @@ from __future__ import annotations
 from datetime import date, timedelta
 
 import polars as pl
+from polars.testing import assert_frame_equal
 
 from src.scanner.engine import ScannerEngine
-from src.scanner.filters.common import MinPriceFilter, MinRVolFilter
+from src.scanner.filters.common import MinAdrFilter, MinPriceFilter, MinRVolFilter
 from src.scanner.filters.gap import GapUpFilter
 from src.scanner.filters.trend import TrendTemplateFilter
+from src.storage.parquet_store import ParquetStore
 
 
 def _write_symbol_data(
@@ -16,7 +18,9 @@ def _write_symbol_data(
     rows: list[dict],
 ) -> None:
     df = pl.DataFrame(rows)
-    df.write_parquet(base_dir / f"{symbol}.parquet")
+    partition = base_dir / f"symbol={symbol}"
+    partition.mkdir()
+    df.write_parquet(partition / "data.parquet")
 
 
 def test_scanner_returns_latest_row_per_symbol(tmp_path):
@@ -176,3 +180,376 @@ def test_rvol_and_trend_template_filters(tmp_path):
     symbols = set(result["symbol"].to_list())
 
     assert symbols == {"TREND"}
+
+
+def test_shared_indicators_are_computed_once(tmp_path):
+    data_dir = tmp_path / "daily"
+    data_dir.mkdir()
+    start = date(2024, 1, 1)
+
+    rows = [
+        {
+            "date": start + timedelta(days=i),
+            "open": 10.0,
+            "high": 10.5,
+            "low": 9.5,
+            "close": 10.0,
+            "volume": 1_000 if i < 24 else 4_000,
+        }
+        for i in range(25)
+    ]
+    _write_symbol_data(data_dir, "SPIKE", rows)
+
+    # Both filters emit avg_volume_20/rvol_20; duplicate names must not clash
+    filters = [MinRVolFilter(1.5), MinRVolFilter(2.0)]
+    result = ScannerEngine(data_dir=data_dir).scan(filters=filters)
+
+    assert result["symbol"].to_list() == ["SPIKE"]
+    assert result["avg_volume_20"].to_list() == [1_150.0]
+    assert abs(result["rvol_20"][0] - 4_000 / 1_150) < 1e-9
+
+
+def test_scanner_reads_from_duckdb_store(tmp_path):
+    from src.storage.duckdb_store import DuckDBStore
+
+    store = DuckDBStore(db_path=tmp_path / "prices.duckdb")
+    rows = [
+        {
+            "date": date(2026, 1, 1),
+            "open": 10.0,
+            "high": 11.0,
+            "low": 9.5,
+            "close": 10.5,
+            "volume": 1000,
+        },
+        {
+            "date": date(2026, 1, 2),
+            "open": 11.0,
+            "high": 12.0,
+            "low": 10.5,
+            "close": 11.5,
+            "volume": 1200,
+        },
+    ]
+    store.save_ticker_data("AAA", pl.DataFrame(rows))
+    # Re-saving the same bars must replace, not duplicate
+    store.save_ticker_data("AAA", pl.DataFrame(rows))
+
+    result = ScannerEngine(store=store).scan(filters=[MinPriceFilter(11.0)])
+
+    assert result["symbol"].to_list() == ["AAA"]
+    assert result["date"].to_list() == [date(2026, 1, 2)]
+    assert store.load_ticker_data("AAA").height == 2
+
+
+def test_latest_rows_prefilter_uses_last_bar_only(tmp_path):
+    data_dir = tmp_path / "daily"
+    data_dir.mkdir()
+
+    _write_symbol_data(
+        data_dir,
+        "UP",
+        [
+            {"date": date(2026, 1, 1), "close": 5.0, "volume": 100},
+            {"date": date(2026, 1, 2), "close": 15.0, "volume": 100},
+        ],
+    )
+    _write_symbol_data(
+        data_dir,
+        "DOWN",
+        [
+            {"date": date(2026, 1, 1), "close": 15.0, "volume": 100},
+            {"date": date(2026, 1, 2), "close": 5.0, "volume": 100},
+        ],
+    )
+
+    latest = ParquetStore(data_dir).latest_rows(min_price=10.0)
+
+    assert latest["symbol"].to_list() == ["UP"]
+    assert latest["date"].to_list() == [date(2026, 1, 2)]
+
+    result = ScannerEngine(data_dir=data_dir).scan(filters=[], symbols=["UP"])
+    assert result["symbol"].to_list() == ["UP"]
+
+
+def test_scan_cache_reuses_results_until_data_changes(tmp_path):
+    data_dir = tmp_path / "daily"
+    data_dir.mkdir()
+    store = ParquetStore(data_dir)
+    bar = {
+        "date": date(2026, 1, 1),
+        "open": 10.0,
+        "high": 11.0,
+        "low": 9.5,
+        "close": 10.5,
+        "volume": 1000,
+    }
+    store.save_ticker_data("AAA", pl.DataFrame([bar]))
+
+    cache_dir = tmp_path / "cache"
+    engine = ScannerEngine(store=store, cache_dir=cache_dir)
+    filters = [MinPriceFilter(10.0)]
+
+    assert engine.scan(filters)["symbol"].to_list() == ["AAA"]
+    assert len(list(cache_dir.rglob("*.parquet"))) == 1
+    # Same filters, unchanged data: served from the cache file
+    assert engine.scan(filters)["symbol"].to_list() == ["AAA"]
+    assert len(list(cache_dir.rglob("*.parquet"))) == 1
+
+    store.save_ticker_data("BBB", pl.DataFrame([{**bar, "close": 20.0}]))
+    assert engine.scan(filters)["symbol"].to_list() == ["AAA", "BBB"]
+    # Results of the old data version are pruned
+    assert len(list(cache_dir.iterdir())) == 1
+    assert len(list(cache_dir.rglob("*.parquet"))) == 1
+
+    # The symbol list is keyed as a set, whatever order the caller passes
+    engine.scan(filters, ["AAA", "BBB"])
+    engine.scan(filters, ["BBB", "AAA"])
+    assert len(list(cache_dir.rglob("*.parquet"))) == 2
+
+
+def test_scan_table_formatting_matches_fstrings():
+    from src.cli import _fixed_2dp, _optional_2dp
+
+    values = [2.5, 1.234, 0.1, 1.006, -3.456, 10.0, 123456.789]
+    values += [float("nan"), float("inf")]
+    df = pl.DataFrame({"rvol_20": values, "close": values}).with_columns(
+        pl.col("close").cast(pl.Float32)
+    )
+
+    formatted = df.select(
+        _fixed_2dp(pl.col("close")).alias("close"),
+        _optional_2dp(df, "rvol_20", suffix="%"),
+        _optional_2dp(df, "adr_20"),
+    )
+
+    expected_close = [f"{x:.2f}" for x in df["close"].to_list()]
+    assert formatted["close"].to_list() == expected_close
+    assert formatted["rvol_20"].to_list() == [f"{x:.2f}%" for x in values]
+    assert formatted["rvol_20"].to_list()[-2:] == ["nan%", "inf%"]
+    assert formatted["adr_20"].to_list() == ["-"] * len(values)
+
+
+def _trend_rows(n: int, start: float, step: float, gap_last: bool = False):
+    # Prices are multiples of 0.25 so the float32 storage cast is exact
+    rows = []
+    for i in range(n):
+        close = start + step * i
+        rows.append(
+            {
+                "date": date(2020, 1, 1) + timedelta(days=i),
+                "open": close,
+                "high": close + 0.5,
+                "low": close - 0.5,
+                "close": close,
+                "volume": 2_000 if i == n - 1 else 1_000 + 10 * (i % 7),
+            }
+        )
+    if gap_last:
+        rows[-1]["open"] = rows[-2]["high"] + 5.0
+    return rows
+
+
+def test_stored_indicators_match_recomputed_ones(tmp_path):
+    histories = {
+        "UP": _trend_rows(300, 10.0, 0.25),
+        "GAP": _trend_rows(300, 20.0, 0.25, gap_last=True),
+        "DOWN": _trend_rows(300, 100.0, -0.25),
+        "SHORT": _trend_rows(100, 10.0, 0.25),
+    }
+
+    def build(name: str, stored: set) -> ScannerEngine:
+        # Tickers in `stored` go through save_ticker_data (with indicator
+        # columns); the rest are files written before indicators were stored.
+        data_dir = tmp_path / name
+        data_dir.mkdir()
+        store = ParquetStore(data_dir)
+        for symbol, rows in histories.items():
+            df = pl.DataFrame(rows).with_columns(
+                pl.col("open", "high", "low", "close").cast(pl.Float32)
+            )
+            if symbol in stored:
+                store.save_ticker_data(symbol, df)
+            else:
+                _write_symbol_data(data_dir, symbol, df.to_dicts())
+        return ScannerEngine(store=store)
+
+    engines = {
+        "stored": build("stored", set(histories)),
+        "raw": build("raw", set()),
+        "mixed": build("mixed", {"UP", "DOWN"}),
+    }
+    assert engines["stored"].store.precomputed_columns()
+    assert not engines["mixed"].store.precomputed_columns()
+
+    for filters in (
+        [MinPriceFilter(1.0), MinRVolFilter(1.5), TrendTemplateFilter()],
+        [GapUpFilter(2.0), MinAdrFilter(0.5)],
+        [MinRVolFilter(0.0, period=10)],
+    ):
+        results = {
+            name: engine.scan(filters).sort("symbol")
+            for name, engine in engines.items()
+        }
+        expected = results["raw"]
+        assert expected.height > 0
+        for result in results.values():
+            assert result["symbol"].to_list() == expected["symbol"].to_list()
+            # Stored indicators are computed before the float32 price cast
+            assert_frame_equal(
+                result.select(expected.columns),
+                expected,
+                check_exact=False,
+                check_dtypes=False,
+                rel_tol=1e-6,
+            )
+
+
+def _bars(start: date, closes: list[float]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "date": [start + timedelta(days=i) for i in range(len(closes))],
+            "open": closes,
+            "high": closes,
+            "low": closes,
+            "close": closes,
+            "volume": [1000] * len(closes),
+        }
+    )
+
+
+def test_append_replaces_overlapping_bars(tmp_path):
+    store = ParquetStore(tmp_path)
+    store.save_ticker_data("AAA", _bars(date(2026, 1, 1), [10.0, 11.0, 12.0]))
+
+    # Re-fetched last bar (revised close) plus one new bar
+    store.append_ticker_data("AAA", _bars(date(2026, 1, 3), [12.5, 13.0]))
+
+    df = store.load_ticker_data("AAA")
+    assert df["date"].to_list() == [date(2026, 1, d) for d in (1, 2, 3, 4)]
+    assert df["close"].to_list() == [10.0, 11.0, 12.5, 13.0]
+
+
+def test_append_after_last_bar_skips_dedupe(tmp_path, monkeypatch):
+    store = ParquetStore(tmp_path)
+    store.save_ticker_data("AAA", _bars(date(2026, 1, 1), [10.0, 11.0]))
+
+    def fail_unique(*args, **kwargs):
+        raise AssertionError("bars after the stored range need no dedupe")
+
+    monkeypatch.setattr(pl.LazyFrame, "unique", fail_unique)
+    store.append_ticker_data("AAA", _bars(date(2026, 1, 3), [12.0, 13.0]))
+
+    df = store.load_ticker_data("AAA")
+    assert df["date"].to_list() == [date(2026, 1, d) for d in (1, 2, 3, 4)]
+    assert df["close"].to_list() == [10.0, 11.0, 12.0, 13.0]
+
+
+def test_last_date_reads_footer_statistics(tmp_path, monkeypatch):
+    store = ParquetStore(tmp_path)
+    assert store.last_date("AAA") is None
+
+    # Enough bars for several row groups; the max spans all of them
+    bars = _bars(date(1990, 1, 1), [10.0] * 20_000)
+    store.save_ticker_data("AAA", bars)
+    assert store._metadata(store.get_file_path("AAA")).num_row_groups > 1
+
+    def fail_read(*args, **kwargs):
+        raise AssertionError("last_date should not read data pages")
+
+    monkeypatch.setattr(pl, "read_parquet", fail_read)
+    monkeypatch.setattr(pl, "scan_parquet", fail_read)
+    assert store.last_date("AAA") == bars["date"].max()
+
+
+def test_trend_indicators_match_rolling_windows():
+    # Histories around each window boundary: 200/220/252 bars
+    lengths = {"S150": 150, "S210": 210, "S230": 230, "S251": 251, "L300": 300}
+    df = pl.concat(
+        pl.DataFrame(
+            {
+                "symbol": symbol,
+                "close": [50 + (i * 37 % 23) * 0.25 + i * 0.1 for i in range(n)],
+                "high": [52 + (i * 17 % 11) * 0.5 + i * 0.1 for i in range(n)],
+                "low": [48 - (i * 13 % 7) * 0.5 + i * 0.1 for i in range(n)],
+            }
+        )
+        for symbol, n in lengths.items()
+    )
+    columns = [
+        "sma_50",
+        "sma_150",
+        "sma_200",
+        "low_252",
+        "high_252",
+        "sma_200_1m_ago",
+    ]
+
+    def last_rows(lf: pl.LazyFrame) -> pl.DataFrame:
+        last = pl.col("symbol").ne_missing(pl.col("symbol").shift(-1))
+        return lf.filter(last).select("symbol", *columns).collect()
+
+    expected = last_rows(
+        df.lazy()
+        .with_columns(
+            pl.col("close").rolling_mean(50).over("symbol").alias("sma_50"),
+            pl.col("close").rolling_mean(150).over("symbol").alias("sma_150"),
+            pl.col("close").rolling_mean(200).over("symbol").alias("sma_200"),
+            pl.col("low").rolling_min(252).over("symbol").alias("low_252"),
+            pl.col("high").rolling_max(252).over("symbol").alias("high_252"),
+        )
+        .with_columns(
+            pl.col("sma_200").shift(20).over("symbol").alias("sma_200_1m_ago")
+        )
+    )
+    result = last_rows(
+        df.lazy().with_columns(TrendTemplateFilter().required_indicators())
+    )
+
+    assert_frame_equal(result, expected, check_exact=False, rel_tol=1e-12)
+    # The boundaries are really exercised: short histories stay null
+    by_symbol = {row["symbol"]: row for row in result.iter_rows(named=True)}
+    assert by_symbol["S150"]["sma_200"] is None
+    assert by_symbol["S210"]["sma_200_1m_ago"] is None
+    assert by_symbol["S230"]["sma_200_1m_ago"] is not None
+    assert by_symbol["S251"]["low_252"] is None
+    assert by_symbol["L300"]["high_252"] is not None
+
+
+def test_scan_parallel_matches_scan_on_mixed_store(tmp_path):
+    data_dir = tmp_path / "daily"
+    data_dir.mkdir()
+    store = ParquetStore(data_dir)
+    # One shard gets re-saved float32 files with stored indicators, the other
+    # legacy float64 files without them
+    for symbol, start in (("AAA", 10.0), ("CCC", 30.0)):
+        store.save_ticker_data(symbol, pl.DataFrame(_trend_rows(300, start, 0.25)))
+    for symbol, start in (("BBB", 20.0), ("DDD", 40.0)):
+        _write_symbol_data(data_dir, symbol, _trend_rows(300, start, 0.25))
+
+    engine = ScannerEngine(store=store)
+    filters = [MinPriceFilter(1.0), MinRVolFilter(1.5), TrendTemplateFilter()]
+    symbols = ["AAA", "BBB", "CCC", "DDD"]
+
+    expected = engine.scan(filters, symbols).sort("symbol")
+    result = engine.scan_parallel(filters, symbols, n_workers=2)
+
+    assert expected["symbol"].to_list() == symbols
+    assert_frame_equal(result, expected, check_exact=False, rel_tol=1e-6)
+
+
+def test_flat_files_move_into_symbol_partitions(tmp_path):
+    ParquetStore(tmp_path).save_ticker_data("BBB", _bars(date(2026, 1, 1), [20.0]))
+    bars = _bars(date(2026, 1, 1), [10.0, 11.0])
+    bars.write_parquet(tmp_path / "AAA.parquet")
+    # BBB exists in both layouts: the partition wins, the flat file stays
+    bars.write_parquet(tmp_path / "BBB.parquet")
+
+    store = ParquetStore(tmp_path)
+
+    assert not (tmp_path / "AAA.parquet").exists()
+    assert (tmp_path / "symbol=AAA" / "data.parquet").exists()
+    assert store.load_ticker_data("AAA")["close"].to_list() == [10.0, 11.0]
+    assert (tmp_path / "BBB.parquet").exists()
+    assert store.load_ticker_data("BBB")["close"].to_list() == [20.0]
+    assert sorted(store.list_existing_tickers()) == ["AAA", "BBB"]